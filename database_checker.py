@@ -1,6 +1,7 @@
 import sqlite3
 import os
 from datetime import datetime
+from schema_migrations import migrate, schema_version, SCHEMA_VERSION
 
 def check_weather_database():
     """Comprehensive database checker for weather_forecast_real.db"""
@@ -91,46 +92,77 @@ def check_weather_database():
                 print(f"   • {missing_table}")
             print()
         
+        # Sealed history partitions are only visible through the weather_history_all view
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='view' AND name='weather_history_all'")
+        history_source = 'weather_history_all' if cursor.fetchone() else 'weather_history'
+        
         # Detailed analysis for weather_history table
         if 'weather_history' in [t[0] for t in tables]:
             print("📈 WEATHER HISTORY ANALYSIS:")
             print("-" * 30)
             
+            # Databases migrated by the app keep per-city rollups; older ones are scanned
+            has_rollups = 'city_stats' in [t[0] for t in tables]
+            
             # Total records
-            cursor.execute("SELECT COUNT(*) FROM weather_history")
+            if has_rollups:
+                cursor.execute("SELECT COALESCE(SUM(search_count), 0) FROM city_stats")
+            else:
+                cursor.execute("SELECT COUNT(*) FROM weather_history")
             total_records = cursor.fetchone()[0]
             print(f"   Total Records: {total_records:,}")
             
             if total_records > 0:
                 # Unique cities
-                cursor.execute("SELECT COUNT(DISTINCT city) FROM weather_history")
+                if has_rollups:
+                    cursor.execute("SELECT COUNT(*) FROM city_stats")
+                else:
+                    cursor.execute("SELECT COUNT(DISTINCT city) FROM weather_history")
                 unique_cities = cursor.fetchone()[0]
                 print(f"   Unique Cities: {unique_cities}")
                 
                 # Date range
-                cursor.execute("SELECT MIN(searched_at), MAX(searched_at) FROM weather_history WHERE searched_at IS NOT NULL")
+                cursor.execute(f"SELECT MIN(searched_at), MAX(searched_at) FROM {history_source} WHERE searched_at IS NOT NULL")
                 date_range = cursor.fetchone()
                 if date_range[0]:
                     print(f"   Date Range: {date_range[0]} to {date_range[1]}")
                 
                 # Temperature stats
-                cursor.execute("SELECT MIN(temperature), MAX(temperature), AVG(temperature) FROM weather_history WHERE temperature IS NOT NULL")
+                if has_rollups:
+                    cursor.execute("SELECT MIN(temp_min), MAX(temp_max), SUM(temp_sum) / SUM(search_count) FROM city_stats")
+                else:
+                    cursor.execute("SELECT MIN(temperature), MAX(temperature), AVG(temperature) FROM weather_history WHERE temperature IS NOT NULL")
                 temp_stats = cursor.fetchone()
                 if temp_stats[0] is not None:
                     print(f"   Temperature Range: {temp_stats[0]:.1f}°C to {temp_stats[1]:.1f}°C (Avg: {temp_stats[2]:.1f}°C)")
                 
                 # Most searched cities
-                cursor.execute("""
-                    SELECT city, COUNT(*) as searches 
-                    FROM weather_history 
-                    GROUP BY city 
-                    ORDER BY searches DESC 
-                    LIMIT 5
-                """)
+                if has_rollups:
+                    cursor.execute("SELECT city, search_count FROM city_stats ORDER BY search_count DESC LIMIT 5")
+                else:
+                    cursor.execute("""
+                        SELECT city, COUNT(*) as searches 
+                        FROM weather_history 
+                        GROUP BY city 
+                        ORDER BY searches DESC 
+                        LIMIT 5
+                    """)
                 top_cities = cursor.fetchall()
                 print("   Top 5 Searched Cities:")
                 for i, (city, searches) in enumerate(top_cities, 1):
                     print(f"      {i}. {city}: {searches} searches")
+                
+                # Sealed partitions
+                if history_source == 'weather_history_all':
+                    cursor.execute("""
+                        SELECT name, row_count, archive_path FROM history_partitions ORDER BY range_start
+                    """)
+                    partitions = cursor.fetchall()
+                    if partitions:
+                        print(f"   History Partitions: {len(partitions)}")
+                        for name, row_count, archive_path in partitions:
+                            location = f"archived to {archive_path}" if archive_path else "live"
+                            print(f"      • {name}: {row_count:,} rows ({location})")
             
             print()
         
@@ -186,9 +218,9 @@ def check_weather_database():
             print("   ✅ No foreign key violations")
         
         # Check for duplicate records in history
-        cursor.execute("""
+        cursor.execute(f"""
             SELECT city, temperature, condition, searched_at, COUNT(*) as duplicates
-            FROM weather_history 
+            FROM {history_source} 
             GROUP BY city, temperature, condition, searched_at
             HAVING COUNT(*) > 1
         """)
@@ -199,7 +231,7 @@ def check_weather_database():
             print("   ✅ No duplicate records found in weather_history")
         
         # Check for NULL values in important fields
-        cursor.execute("SELECT COUNT(*) FROM weather_history WHERE city IS NULL OR temperature IS NULL")
+        cursor.execute(f"SELECT COUNT(*) FROM {history_source} WHERE city IS NULL OR temperature IS NULL")
         null_important = cursor.fetchone()[0]
         if null_important > 0:
             print(f"   ⚠️  Found {null_important} records with NULL city or temperature")
@@ -222,6 +254,13 @@ def check_weather_database():
         else:
             print("   ⚠️  No custom indexes found (may affect query performance)")
         
+        # Schema migrations applied by the app
+        version = schema_version(conn)
+        if version < SCHEMA_VERSION:
+            print(f"   ⚠️  Schema version {version} of {SCHEMA_VERSION} (start the app to apply migrations)")
+        else:
+            print(f"   ✅ Schema version {version} (up to date)")
+        
         # Database page size and other settings
         cursor.execute("PRAGMA page_size")
         page_size = cursor.fetchone()[0]
@@ -301,13 +340,10 @@ def create_database_if_missing():
             )
         ''')
         
-        # Create useful indexes
-        cursor.execute('CREATE INDEX idx_weather_history_city ON weather_history(city)')
-        cursor.execute('CREATE INDEX idx_weather_history_date ON weather_history(searched_at)')
-        cursor.execute('CREATE INDEX idx_weather_forecast_city ON weather_forecast(city)')
-        cursor.execute('CREATE INDEX idx_weather_forecast_date ON weather_forecast(forecast_date)')
-        
         conn.commit()
+        
+        # Indexes and the schema version come from the same migrations the app runs
+        migrate(conn)
         conn.close()
         
         print("✅ Database created successfully!")
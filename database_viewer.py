@@ -1,9 +1,11 @@
-import sqlite3
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-from datetime import datetime
-import csv
+from datetime import datetime, timedelta
 import os
+from concurrent.futures import ThreadPoolExecutor
+from weather_repository import WeatherRepository, HISTORY_COLUMNS, FORECAST_COLUMNS
+from db_manager import get_manager
+from weather_export import export_all, parquet_available, ExportCancelled
 
 class WeatherDatabaseViewer:
     def __init__(self, root):
@@ -13,6 +15,29 @@ class WeatherDatabaseViewer:
         self.root.configure(bg='#f0f0f0')
         
         self.db_path = 'weather_forecast_real.db'
+        self.repository = WeatherRepository(self.db_path)
+        if os.path.exists(self.db_path):
+            self.repository.init_schema()
+        
+        # History grid is filled one keyset page at a time as the user scrolls
+        self.history_page_size = 200
+        self.history_filter = None
+        self.history_after = None
+        self.history_exhausted = True
+        self.history_loading = False
+        self.history_prefetch_id = None
+        
+        # Header clicks sort in SQL on the raw column: (column, descending)
+        self.history_sort = ('searched_at', True)
+        self.forecast_sort = (None, False)
+        
+        # Keystroke searches are debounced and run off the Tk thread; a newer
+        # search bumps the generation, which interrupts the older query
+        self.search_executor = ThreadPoolExecutor(max_workers=2)
+        self.search_debounce_ms = 250
+        self.poll_interval_ms = 50
+        self.history_search_id = None
+        self.history_search_generation = 0
         
         self.create_widgets()
         self.refresh_all_data()
@@ -75,8 +100,8 @@ class WeatherDatabaseViewer:
         
         tk.Button(
             left_buttons,
-            text="📊 Export All CSV",
-            command=self.export_all_csv,
+            text="📊 Export Data",
+            command=self.export_data,
             bg='#2196f3',
             fg='white',
             font=("Arial", 10, "bold"),
@@ -157,7 +182,7 @@ class WeatherDatabaseViewer:
         search_frame = tk.Frame(self.history_frame, bg='white')
         search_frame.pack(fill='x', padx=10, pady=5)
         
-        tk.Label(search_frame, text="🔍 Search City:", font=("Arial", 10, "bold"), bg='white').pack(side='left', padx=5)
+        tk.Label(search_frame, text="🔍 Search:", font=("Arial", 10, "bold"), bg='white').pack(side='left', padx=5)
         
         self.search_entry = tk.Entry(search_frame, font=("Arial", 10), width=20)
         self.search_entry.pack(side='left', padx=5)
@@ -188,14 +213,17 @@ class WeatherDatabaseViewer:
             'Feels Like': 80, 'Visibility': 70, 'Search Date': 150
         }
         
+        self.history_sort_columns = dict(zip(history_columns, HISTORY_COLUMNS))
         for col in history_columns:
-            self.history_tree.heading(col, text=col, command=lambda c=col: self.sort_treeview(self.history_tree, c))
+            self.history_tree.heading(col, text=col, command=lambda c=col: self.sort_history(c))
             self.history_tree.column(col, width=column_widths.get(col, 100), minwidth=50)
+        self.show_sort_arrows(self.history_tree, self.history_sort_columns, self.history_sort)
         
         # Scrollbars for history
         history_v_scroll = ttk.Scrollbar(self.history_frame, orient='vertical', command=self.history_tree.yview)
         history_h_scroll = ttk.Scrollbar(self.history_frame, orient='horizontal', command=self.history_tree.xview)
-        self.history_tree.configure(yscrollcommand=history_v_scroll.set, xscrollcommand=history_h_scroll.set)
+        self.history_v_scroll = history_v_scroll
+        self.history_tree.configure(yscrollcommand=self.on_history_scroll, xscrollcommand=history_h_scroll.set)
         
         # Pack history components
         self.history_tree.pack(side='left', fill='both', expand=True)
@@ -249,8 +277,9 @@ class WeatherDatabaseViewer:
             'Wind Speed': 80, 'Precipitation %': 100, 'Created At': 150
         }
         
+        self.forecast_sort_columns = dict(zip(forecast_columns, FORECAST_COLUMNS))
         for col in forecast_columns:
-            self.forecast_tree.heading(col, text=col, command=lambda c=col: self.sort_treeview(self.forecast_tree, c))
+            self.forecast_tree.heading(col, text=col, command=lambda c=col: self.sort_forecasts(c))
             self.forecast_tree.column(col, width=forecast_widths.get(col, 100), minwidth=50)
         
         # Scrollbars for forecast
@@ -328,23 +357,16 @@ class WeatherDatabaseViewer:
             return False
         
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
             # Get file info
             size = os.path.getsize(self.db_path)
             size_kb = size / 1024
             
             # Count records
-            cursor.execute("SELECT COUNT(*) FROM weather_history")
-            history_count = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT COUNT(*) FROM weather_forecast")
-            forecast_count = cursor.fetchone()[0]
+            history_count = self.repository.count_history()
+            forecast_count = self.repository.count_forecasts()
             
             # Get date range
-            cursor.execute("SELECT MIN(searched_at), MAX(searched_at) FROM weather_history WHERE searched_at IS NOT NULL")
-            date_range = cursor.fetchone()
+            date_range = self.repository.history_date_range()
             
             status_text = f"✅ Database: {self.db_path} | Size: {size_kb:.1f} KB | "
             status_text += f"History: {history_count} records | Forecasts: {forecast_count} records"
@@ -353,7 +375,6 @@ class WeatherDatabaseViewer:
                 status_text += f" | Range: {date_range[0][:10]} to {date_range[1][:10]}"
             
             self.status_label.config(text=status_text, fg='green')
-            conn.close()
             return True
             
         except Exception as e:
@@ -361,60 +382,77 @@ class WeatherDatabaseViewer:
             return False
     
     def load_history_data(self, filter_city=None):
-        """Load weather history data"""
-        # Clear existing data
-        for item in self.history_tree.get_children():
-            self.history_tree.delete(item)
-        
-        if not os.path.exists(self.db_path):
+        """Load the first page of weather history; later pages load on scroll"""
+        self.cancel_history_search()
+        self.reset_history(filter_city)
+        self.load_more_history()
+    
+    def reset_history(self, filter_city):
+        """Empty the grid and restart paging for a new filter"""
+        self.history_tree.delete(*self.history_tree.get_children())
+        self.history_filter = filter_city
+        self.history_after = None
+        self.history_exhausted = not os.path.exists(self.db_path)
+    
+    def load_more_history(self):
+        """Append the next keyset page of history rows to the grid"""
+        if self.history_exhausted or self.history_loading:
             return
         
+        self.history_loading = True
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            if filter_city:
-                cursor.execute("""
-                    SELECT id, city, country, temperature, condition, description,
-                           humidity, wind_speed, pressure, feels_like, visibility, searched_at
-                    FROM weather_history 
-                    WHERE city LIKE ?
-                    ORDER BY searched_at DESC
-                """, (f'%{filter_city}%',))
-            else:
-                cursor.execute("""
-                    SELECT id, city, country, temperature, condition, description,
-                           humidity, wind_speed, pressure, feels_like, visibility, searched_at
-                    FROM weather_history 
-                    ORDER BY searched_at DESC
-                """)
-            
-            for row in cursor.fetchall():
-                # Format the data for display
-                formatted_row = list(row)
-                
-                # Format temperature
-                if formatted_row[3]: formatted_row[3] = f"{formatted_row[3]:.1f}°C"
-                if formatted_row[6]: formatted_row[6] = f"{formatted_row[6]}%"
-                if formatted_row[7]: formatted_row[7] = f"{formatted_row[7]:.1f} km/h"
-                if formatted_row[8]: formatted_row[8] = f"{formatted_row[8]} hPa"
-                if formatted_row[9]: formatted_row[9] = f"{formatted_row[9]:.1f}°C"
-                if formatted_row[10]: formatted_row[10] = f"{formatted_row[10]} km"
-                
-                # Format timestamp
-                if formatted_row[11]:
-                    try:
-                        dt = datetime.fromisoformat(formatted_row[11].replace('Z', '+00:00') if 'Z' in formatted_row[11] else formatted_row[11])
-                        formatted_row[11] = dt.strftime("%Y-%m-%d %H:%M:%S")
-                    except:
-                        pass
-                
-                self.history_tree.insert('', 'end', values=formatted_row)
-            
-            conn.close()
+            sort_column, descending = self.history_sort
+            self.append_history_rows(self.repository.history_page(
+                self.history_filter, self.history_after, self.history_page_size, sort_column, descending
+            ))
             
         except Exception as e:
+            self.history_exhausted = True
             messagebox.showerror("Database Error", f"Error loading history data: {str(e)}")
+        finally:
+            self.history_loading = False
+    
+    def append_history_rows(self, rows):
+        """Insert one page of raw rows and remember where it ended"""
+        for row in rows:
+            self.history_tree.insert('', 'end', values=self.format_history_row(row))
+        
+        if rows:
+            sort_index = HISTORY_COLUMNS.index(self.history_sort[0])
+            self.history_after = (rows[-1][sort_index], rows[-1][0])
+        self.history_exhausted = len(rows) < self.history_page_size
+    
+    def on_history_scroll(self, first, last):
+        """Scrollbar callback; prefetch the next page when nearing the end"""
+        self.history_v_scroll.set(first, last)
+        if float(last) > 0.9 and not self.history_exhausted and self.history_prefetch_id is None:
+            self.history_prefetch_id = self.root.after_idle(self.prefetch_history)
+    
+    def prefetch_history(self):
+        self.history_prefetch_id = None
+        self.load_more_history()
+    
+    def format_history_row(self, row):
+        """Format one raw history row for display"""
+        formatted_row = list(row)
+        
+        # Format temperature
+        if formatted_row[3]: formatted_row[3] = f"{formatted_row[3]:.1f}°C"
+        if formatted_row[6]: formatted_row[6] = f"{formatted_row[6]}%"
+        if formatted_row[7]: formatted_row[7] = f"{formatted_row[7]:.1f} km/h"
+        if formatted_row[8]: formatted_row[8] = f"{formatted_row[8]} hPa"
+        if formatted_row[9]: formatted_row[9] = f"{formatted_row[9]:.1f}°C"
+        if formatted_row[10]: formatted_row[10] = f"{formatted_row[10]} km"
+        
+        # Format timestamp
+        if formatted_row[11]:
+            try:
+                dt = datetime.fromisoformat(formatted_row[11].replace('Z', '+00:00') if 'Z' in formatted_row[11] else formatted_row[11])
+                formatted_row[11] = dt.strftime("%Y-%m-%d %H:%M:%S")
+            except:
+                pass
+        
+        return formatted_row
     
     def load_forecast_data(self, filter_city=None):
         """Load forecast data"""
@@ -426,26 +464,8 @@ class WeatherDatabaseViewer:
             return
         
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            if filter_city:
-                cursor.execute("""
-                    SELECT id, city, day_name, forecast_date, high_temp, low_temp, condition,
-                           description, humidity, wind_speed, precipitation_chance, created_at
-                    FROM weather_forecast 
-                    WHERE city = ?
-                    ORDER BY city, forecast_date
-                """, (filter_city,))
-            else:
-                cursor.execute("""
-                    SELECT id, city, day_name, forecast_date, high_temp, low_temp, condition,
-                           description, humidity, wind_speed, precipitation_chance, created_at
-                    FROM weather_forecast 
-                    ORDER BY city, forecast_date
-                """)
-            
-            for row in cursor.fetchall():
+            sort_column, descending = self.forecast_sort
+            for row in self.repository.forecast_rows(filter_city, sort_column, descending):
                 # Format the data for display
                 formatted_row = list(row)
                 
@@ -466,8 +486,6 @@ class WeatherDatabaseViewer:
                 
                 self.forecast_tree.insert('', 'end', values=formatted_row)
             
-            conn.close()
-            
         except Exception as e:
             messagebox.showerror("Database Error", f"Error loading forecast data: {str(e)}")
     
@@ -480,113 +498,81 @@ class WeatherDatabaseViewer:
             return
         
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            stats = "📊 WEATHER DATABASE STATISTICS\n"
-            stats += "=" * 60 + "\n\n"
-            
-            # History statistics
-            cursor.execute("SELECT COUNT(*) FROM weather_history")
-            total_searches = cursor.fetchone()[0]
-            stats += f"📈 WEATHER HISTORY:\n"
-            stats += f"   Total Searches: {total_searches}\n"
-            
-            if total_searches > 0:
-                cursor.execute("SELECT COUNT(DISTINCT city) FROM weather_history")
-                unique_cities = cursor.fetchone()[0]
-                stats += f"   Unique Cities: {unique_cities}\n"
-                
-                cursor.execute("SELECT AVG(temperature), MIN(temperature), MAX(temperature) FROM weather_history WHERE temperature IS NOT NULL")
-                temp_stats = cursor.fetchone()
-                if temp_stats[0]:
-                    stats += f"   Temperature - Avg: {temp_stats[0]:.1f}°C, Min: {temp_stats[1]:.1f}°C, Max: {temp_stats[2]:.1f}°C\n"
-                
-                cursor.execute("SELECT AVG(humidity), AVG(wind_speed), AVG(pressure) FROM weather_history WHERE humidity IS NOT NULL")
-                other_stats = cursor.fetchone()
-                if other_stats[0]:
-                    stats += f"   Avg Humidity: {other_stats[0]:.1f}%, Avg Wind: {other_stats[1]:.1f} km/h, Avg Pressure: {other_stats[2]:.0f} hPa\n"
-                
-                # Most searched cities
-                cursor.execute("""
-                    SELECT city, COUNT(*) as search_count 
-                    FROM weather_history 
-                    GROUP BY city 
-                    ORDER BY search_count DESC 
-                    LIMIT 10
-                """)
+            with self.repository.db.reader() as conn:
+                cursor = conn.cursor()
                 
-                stats += f"\n🏆 TOP 10 MOST SEARCHED CITIES:\n"
-                for i, (city, count) in enumerate(cursor.fetchall(), 1):
-                    stats += f"   {i:2d}. {city:<20} {count:3d} searches\n"
+                stats = "📊 WEATHER DATABASE STATISTICS\n"
+                stats += "=" * 60 + "\n\n"
                 
-                # Weather conditions distribution
-                cursor.execute("""
-                    SELECT condition, COUNT(*) as count 
-                    FROM weather_history 
-                    WHERE condition IS NOT NULL
-                    GROUP BY condition 
-                    ORDER BY count DESC
-                """)
+                # History statistics come from the city/condition rollups, not the raw rows
+                summary = self.repository.history_summary()
+                total_searches = summary[0]
+                stats += f"📈 WEATHER HISTORY:\n"
+                stats += f"   Total Searches: {total_searches}\n"
                 
-                stats += f"\n🌤️  WEATHER CONDITIONS:\n"
-                conditions = cursor.fetchall()
-                for condition, count in conditions:
-                    percentage = (count / total_searches) * 100
-                    stats += f"   {condition:<15} {count:3d} ({percentage:5.1f}%)\n"
-            
-            # Forecast statistics
-            cursor.execute("SELECT COUNT(*) FROM weather_forecast")
-            total_forecasts = cursor.fetchone()[0]
-            stats += f"\n📅 FORECAST DATA:\n"
-            stats += f"   Total Forecast Records: {total_forecasts}\n"
-            
-            if total_forecasts > 0:
-                cursor.execute("SELECT COUNT(DISTINCT city) FROM weather_forecast")
-                forecast_cities = cursor.fetchone()[0]
-                stats += f"   Cities with Forecasts: {forecast_cities}\n"
+                if total_searches > 0:
+                    stats += f"   Unique Cities: {summary[1]}\n"
+                    
+                    if summary[2] is not None:
+                        stats += f"   Temperature - Avg: {summary[2]:.1f}°C, Min: {summary[3]:.1f}°C, Max: {summary[4]:.1f}°C\n"
+                    
+                    if None not in summary[5:8]:
+                        stats += f"   Avg Humidity: {summary[5]:.1f}%, Avg Wind: {summary[6]:.1f} km/h, Avg Pressure: {summary[7]:.0f} hPa\n"
+                    
+                    # Most searched cities
+                    stats += f"\n🏆 TOP 10 MOST SEARCHED CITIES:\n"
+                    for i, (city, count) in enumerate(self.repository.top_cities(10), 1):
+                        stats += f"   {i:2d}. {city:<20} {count:3d} searches\n"
+                    
+                    # Weather conditions distribution
+                    stats += f"\n🌤️  WEATHER CONDITIONS:\n"
+                    for condition, count in self.repository.condition_counts():
+                        percentage = (count / total_searches) * 100
+                        stats += f"   {condition:<15} {count:3d} ({percentage:5.1f}%)\n"
                 
-                cursor.execute("SELECT AVG(high_temp), AVG(low_temp), MIN(low_temp), MAX(high_temp) FROM weather_forecast WHERE high_temp IS NOT NULL")
-                forecast_temps = cursor.fetchone()
-                if forecast_temps[0]:
-                    stats += f"   Forecast Temps - Avg High: {forecast_temps[0]:.1f}°C, Avg Low: {forecast_temps[1]:.1f}°C\n"
-                    stats += f"   Temperature Range: {forecast_temps[2]:.1f}°C to {forecast_temps[3]:.1f}°C\n"
+                # Forecast statistics
+                cursor.execute("SELECT COUNT(*) FROM weather_forecast")
+                total_forecasts = cursor.fetchone()[0]
+                stats += f"\n📅 FORECAST DATA:\n"
+                stats += f"   Total Forecast Records: {total_forecasts}\n"
                 
-                # Forecast by city
-                cursor.execute("""
-                    SELECT city, COUNT(*) as forecast_count 
-                    FROM weather_forecast 
-                    GROUP BY city 
-                    ORDER BY forecast_count DESC
-                """)
+                if total_forecasts > 0:
+                    cursor.execute("SELECT COUNT(DISTINCT city) FROM weather_forecast")
+                    forecast_cities = cursor.fetchone()[0]
+                    stats += f"   Cities with Forecasts: {forecast_cities}\n"
+                    
+                    cursor.execute("SELECT AVG(high_temp), AVG(low_temp), MIN(low_temp), MAX(high_temp) FROM weather_forecast WHERE high_temp IS NOT NULL")
+                    forecast_temps = cursor.fetchone()
+                    if forecast_temps[0]:
+                        stats += f"   Forecast Temps - Avg High: {forecast_temps[0]:.1f}°C, Avg Low: {forecast_temps[1]:.1f}°C\n"
+                        stats += f"   Temperature Range: {forecast_temps[2]:.1f}°C to {forecast_temps[3]:.1f}°C\n"
+                    
+                    # Forecast by city
+                    cursor.execute("""
+                        SELECT city, COUNT(*) as forecast_count 
+                        FROM weather_forecast 
+                        GROUP BY city 
+                        ORDER BY forecast_count DESC
+                    """)
+                    
+                    stats += f"\n🏙️  FORECASTS BY CITY:\n"
+                    for city, count in cursor.fetchall():
+                        stats += f"   {city:<20} {count:2d} days\n"
                 
-                stats += f"\n🏙️  FORECASTS BY CITY:\n"
-                for city, count in cursor.fetchall():
-                    stats += f"   {city:<20} {count:2d} days\n"
-            
-            # Recent activity
-            cursor.execute("""
-                SELECT city, searched_at 
-                FROM weather_history 
-                WHERE searched_at IS NOT NULL
-                ORDER BY searched_at DESC 
-                LIMIT 5
-            """)
-            
-            stats += f"\n🕒 RECENT SEARCHES:\n"
-            recent = cursor.fetchall()
-            if recent:
-                for city, timestamp in recent:
-                    try:
-                        dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00') if 'Z' in timestamp else timestamp)
-                        time_str = dt.strftime("%Y-%m-%d %H:%M")
-                        stats += f"   {city:<20} {time_str}\n"
-                    except:
-                        stats += f"   {city:<20} {timestamp}\n"
-            else:
-                stats += "   No recent searches found\n"
+                # Recent activity, including sealed partitions
+                stats += f"\n🕒 RECENT SEARCHES:\n"
+                recent = [(city, timestamp) for city, _, _, timestamp in self.repository.recent_history(5) if timestamp]
+                if recent:
+                    for city, timestamp in recent:
+                        try:
+                            dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00') if 'Z' in timestamp else timestamp)
+                            time_str = dt.strftime("%Y-%m-%d %H:%M")
+                            stats += f"   {city:<20} {time_str}\n"
+                        except:
+                            stats += f"   {city:<20} {timestamp}\n"
+                else:
+                    stats += "   No recent searches found\n"
             
-            conn.close()
             self.stats_text.insert(tk.END, stats)
             
         except Exception as e:
@@ -601,60 +587,59 @@ class WeatherDatabaseViewer:
             return
         
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            schema_info = "🏗️  DATABASE SCHEMA INFORMATION\n"
-            schema_info += "=" * 60 + "\n\n"
-            
-            # Get all tables
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-            tables = cursor.fetchall()
-            
-            for table_name, in tables:
-                schema_info += f"📋 TABLE: {table_name.upper()}\n"
-                schema_info += "-" * 40 + "\n"
+            with self.repository.db.reader() as conn:
+                cursor = conn.cursor()
                 
-                # Get table info
-                cursor.execute(f"PRAGMA table_info({table_name})")
-                columns = cursor.fetchall()
+                schema_info = "🏗️  DATABASE SCHEMA INFORMATION\n"
+                schema_info += "=" * 60 + "\n\n"
                 
-                schema_info += f"{'Column':<20} {'Type':<15} {'Null':<8} {'Default':<15} {'PK'}\n"
-                schema_info += "-" * 70 + "\n"
+                # Get all tables
+                cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
+                tables = cursor.fetchall()
                 
-                for col in columns:
-                    cid, name, col_type, notnull, default_val, pk = col
-                    null_str = "NOT NULL" if notnull else "NULL"
-                    default_str = str(default_val) if default_val else ""
-                    pk_str = "YES" if pk else ""
+                for table_name, in tables:
+                    schema_info += f"📋 TABLE: {table_name.upper()}\n"
+                    schema_info += "-" * 40 + "\n"
+                    
+                    # Get table info
+                    cursor.execute(f"PRAGMA table_info({table_name})")
+                    columns = cursor.fetchall()
                     
-                    schema_info += f"{name:<20} {col_type:<15} {null_str:<8} {default_str:<15} {pk_str}\n"
+                    schema_info += f"{'Column':<20} {'Type':<15} {'Null':<8} {'Default':<15} {'PK'}\n"
+                    schema_info += "-" * 70 + "\n"
+                    
+                    for col in columns:
+                        cid, name, col_type, notnull, default_val, pk = col
+                        null_str = "NOT NULL" if notnull else "NULL"
+                        default_str = str(default_val) if default_val else ""
+                        pk_str = "YES" if pk else ""
+                        
+                        schema_info += f"{name:<20} {col_type:<15} {null_str:<8} {default_str:<15} {pk_str}\n"
+                    
+                    # Get record count
+                    cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
+                    count = cursor.fetchone()[0]
+                    schema_info += f"\nRecord Count: {count}\n\n"
                 
-                # Get record count
-                cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-                count = cursor.fetchone()[0]
-                schema_info += f"\nRecord Count: {count}\n\n"
-            
-            # Get indexes
-            cursor.execute("SELECT name, sql FROM sqlite_master WHERE type='index' AND sql IS NOT NULL")
-            indexes = cursor.fetchall()
-            
-            if indexes:
-                schema_info += "📊 INDEXES:\n"
+                # Get indexes
+                cursor.execute("SELECT name, sql FROM sqlite_master WHERE type='index' AND sql IS NOT NULL")
+                indexes = cursor.fetchall()
+                
+                if indexes:
+                    schema_info += "📊 INDEXES:\n"
+                    schema_info += "-" * 20 + "\n"
+                    for name, sql in indexes:
+                        schema_info += f"{name}: {sql}\n"
+                    schema_info += "\n"
+                
+                # Database file info
+                schema_info += "📁 FILE INFORMATION:\n"
                 schema_info += "-" * 20 + "\n"
-                for name, sql in indexes:
-                    schema_info += f"{name}: {sql}\n"
-                schema_info += "\n"
-            
-            # Database file info
-            schema_info += "📁 FILE INFORMATION:\n"
-            schema_info += "-" * 20 + "\n"
-            size = os.path.getsize(self.db_path)
-            schema_info += f"File Path: {os.path.abspath(self.db_path)}\n"
-            schema_info += f"File Size: {size:,} bytes ({size/1024:.1f} KB)\n"
-            schema_info += f"Last Modified: {datetime.fromtimestamp(os.path.getmtime(self.db_path)).strftime('%Y-%m-%d %H:%M:%S')}\n"
+                size = os.path.getsize(self.db_path)
+                schema_info += f"File Path: {os.path.abspath(self.db_path)}\n"
+                schema_info += f"File Size: {size:,} bytes ({size/1024:.1f} KB)\n"
+                schema_info += f"Last Modified: {datetime.fromtimestamp(os.path.getmtime(self.db_path)).strftime('%Y-%m-%d %H:%M:%S')}\n"
             
-            conn.close()
             self.schema_text.insert(tk.END, schema_info)
             
         except Exception as e:
@@ -666,26 +651,54 @@ class WeatherDatabaseViewer:
             return
         
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("SELECT DISTINCT city FROM weather_forecast ORDER BY city")
-            cities = [row[0] for row in cursor.fetchall()]
-            
-            self.forecast_filter['values'] = cities
-            
-            conn.close()
+            self.forecast_filter['values'] = self.repository.forecast_cities()
             
         except Exception as e:
             print(f"Error updating forecast filter: {e}")
     
     def filter_history(self, event=None):
-        """Filter history by city name"""
-        filter_text = self.search_entry.get().strip()
-        if filter_text:
-            self.load_history_data(filter_text)
-        else:
-            self.load_history_data()
+        """Filter history as the user types, once typing pauses"""
+        if self.history_search_id is not None:
+            self.root.after_cancel(self.history_search_id)
+        self.history_search_id = self.root.after(self.search_debounce_ms, self.search_history)
+    
+    def cancel_history_search(self):
+        """Drop a pending search and interrupt one that is still running"""
+        if self.history_search_id is not None:
+            self.root.after_cancel(self.history_search_id)
+            self.history_search_id = None
+        self.history_search_generation += 1
+    
+    def search_history(self):
+        """Fetch the first page for the current filter text in the background"""
+        self.history_search_id = None
+        self.history_search_generation += 1
+        generation = self.history_search_generation
+        filter_text = self.search_entry.get().strip() or None
+        sort_column, descending = self.history_sort
+        
+        future = self.search_executor.submit(
+            self.repository.history_page, filter_text, None, self.history_page_size, sort_column, descending,
+            lambda: generation != self.history_search_generation
+        )
+        self.root.after(self.poll_interval_ms, self.poll_history_search, generation, filter_text, future)
+    
+    def poll_history_search(self, generation, filter_text, future):
+        """Show a finished search unless a newer one has started since"""
+        if generation != self.history_search_generation:
+            return
+        if not future.done():
+            self.root.after(self.poll_interval_ms, self.poll_history_search, generation, filter_text, future)
+            return
+        
+        try:
+            rows = future.result()
+        except Exception as e:
+            messagebox.showerror("Database Error", f"Error searching history: {str(e)}")
+            return
+        
+        self.reset_history(filter_text)
+        self.append_history_rows(rows)
     
     def clear_filter(self):
         """Clear history filter"""
@@ -703,74 +716,38 @@ class WeatherDatabaseViewer:
         self.forecast_filter.set('')
         self.load_forecast_data()
     
-    def sort_treeview(self, tree, col):
-        """Sort treeview by column"""
-        data = [(tree.set(child, col), child) for child in tree.get_children('')]
-        
-        # Try to sort numerically if possible
-        try:
-            data.sort(key=lambda x: float(x[0].replace('°C', '').replace('%', '').replace(' km/h', '').replace(' hPa', '').replace(' km', '')))
-        except:
-            data.sort()
-        
-        for index, (val, child) in enumerate(data):
-            tree.move(child, '', index)
+    def next_sort(self, current, column):
+        """Clicking the sorted column flips direction; a new column starts ascending"""
+        sort_column, descending = current
+        return (column, not descending) if column == sort_column else (column, False)
     
-    def export_all_csv(self):
-        """Export all data to CSV files"""
-        try:
-            if not os.path.exists(self.db_path):
-                messagebox.showerror("Error", "Database not found!")
-                return
-            
-            # Ask for directory
-            directory = filedialog.askdirectory(title="Select directory to save CSV files")
-            if not directory:
-                return
-            
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Export history
-            cursor.execute("SELECT * FROM weather_history ORDER BY searched_at DESC")
-            history_data = cursor.fetchall()
-            
-            history_file = os.path.join(directory, 'weather_history.csv')
-            with open(history_file, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.writer(csvfile)
-                writer.writerow([
-                    'ID', 'City', 'Country', 'Temperature', 'Condition', 'Description',
-                    'Humidity', 'Wind Speed', 'Pressure', 'Feels Like', 'Visibility', 'UV Index', 'Search Date'
-                ])
-                writer.writerows(history_data)
-            
-            # Export forecast
-            cursor.execute("SELECT * FROM weather_forecast ORDER BY city, forecast_date")
-            forecast_data = cursor.fetchall()
-            
-            forecast_file = os.path.join(directory, 'weather_forecast.csv')
-            with open(forecast_file, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.writer(csvfile)
-                writer.writerow([
-                    'ID', 'City', 'Day Name', 'Forecast Date', 'High Temp', 'Low Temp',
-                    'Condition', 'Description', 'Humidity', 'Wind Speed', 'Precipitation Chance', 'Created At'
-                ])
-                writer.writerows(forecast_data)
-            
-            conn.close()
-            
-            messagebox.showinfo(
-                "Export Complete",
-                f"Data exported successfully!\n\n"
-                f"Files created:\n"
-                f"• {history_file}\n"
-                f"• {forecast_file}\n\n"
-                f"History records: {len(history_data)}\n"
-                f"Forecast records: {len(forecast_data)}"
-            )
-            
-        except Exception as e:
-            messagebox.showerror("Export Error", f"Failed to export data: {str(e)}")
+    def show_sort_arrows(self, tree, sort_columns, current):
+        """Mark the sorted column's heading with its direction"""
+        for heading, column in sort_columns.items():
+            arrow = ''
+            if column == current[0]:
+                arrow = ' ▼' if current[1] else ' ▲'
+            tree.heading(heading, text=heading + arrow)
+    
+    def sort_history(self, heading):
+        """Re-query the history grid ordered by a column, from the first page"""
+        self.history_sort = self.next_sort(self.history_sort, self.history_sort_columns[heading])
+        self.show_sort_arrows(self.history_tree, self.history_sort_columns, self.history_sort)
+        self.load_history_data(self.history_filter)
+    
+    def sort_forecasts(self, heading):
+        """Re-query the forecast grid ordered by a column"""
+        self.forecast_sort = self.next_sort(self.forecast_sort, self.forecast_sort_columns[heading])
+        self.show_sort_arrows(self.forecast_tree, self.forecast_sort_columns, self.forecast_sort)
+        self.load_forecast_data(self.forecast_filter.get() or None)
+    
+    def export_data(self):
+        """Open the export window (CSV, JSON Lines or Parquet)"""
+        if not os.path.exists(self.db_path):
+            messagebox.showerror("Error", "Database not found!")
+            return
+        
+        ExportWindow(self.root, self.repository)
     
     def clear_history(self):
         """Clear all weather history"""
@@ -778,15 +755,7 @@ class WeatherDatabaseViewer:
             return
         
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("SELECT COUNT(*) FROM weather_history")
-            count = cursor.fetchone()[0]
-            
-            cursor.execute("DELETE FROM weather_history")
-            conn.commit()
-            conn.close()
+            count = self.repository.clear_history()
             
             messagebox.showinfo("Success", f"Cleared {count} weather history records!")
             self.refresh_all_data()
@@ -800,15 +769,7 @@ class WeatherDatabaseViewer:
             return
         
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("SELECT COUNT(*) FROM weather_forecast")
-            count = cursor.fetchone()[0]
-            
-            cursor.execute("DELETE FROM weather_forecast")
-            conn.commit()
-            conn.close()
+            count = self.repository.clear_forecasts()
             
             messagebox.showinfo("Success", f"Cleared {count} forecast records!")
             self.refresh_all_data()
@@ -822,9 +783,6 @@ class WeatherDatabaseViewer:
             return
         
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
             # Sample history data
             sample_history = [
                 ('New York', 'US', 21.5, 'Clear', 'Clear Sky', 45, 12.3, 1013, 23.1, 10, None),
@@ -835,13 +793,7 @@ class WeatherDatabaseViewer:
                 ('Mumbai', 'IN', 32.1, 'Clouds', 'Few Clouds', 68, 9.3, 1009, 35.8, 7, None)
             ]
             
-            for data in sample_history:
-                cursor.execute('''
-                    INSERT INTO weather_history 
-                    (city, country, temperature, condition, description, humidity, 
-                     wind_speed, pressure, feels_like, visibility, uv_index)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', data)
+            self.repository.insert_history_rows(sample_history)
             
             # Sample forecast data
             cities = ['New York', 'London', 'Tokyo', 'Paris']
@@ -849,6 +801,7 @@ class WeatherDatabaseViewer:
             conditions = ['Clear', 'Clouds', 'Rain', 'Snow']
             
             import random
+            sample_forecast = []
             for city in cities:
                 for i, day in enumerate(days):
                     high = random.randint(15, 30)
@@ -856,16 +809,10 @@ class WeatherDatabaseViewer:
                     condition = random.choice(conditions)
                     forecast_date = datetime.now().date() + timedelta(days=i)
                     
-                    cursor.execute('''
-                        INSERT INTO weather_forecast 
-                        (city, day_name, forecast_date, high_temp, low_temp, condition, 
-                         description, humidity, wind_speed, precipitation_chance)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (city, day, forecast_date, high, low, condition, condition, 
-                          random.randint(40, 80), random.uniform(5, 20), random.randint(0, 60)))
+                    sample_forecast.append((city, day, forecast_date, high, low, condition, condition, 
+                                            random.randint(40, 80), random.uniform(5, 20), random.randint(0, 60)))
             
-            conn.commit()
-            conn.close()
+            self.repository.insert_forecast_rows(sample_forecast)
             
             messagebox.showinfo("Success", f"Added sample data:\n• {len(sample_history)} history records\n• {len(cities) * len(days)} forecast records")
             self.refresh_all_data()
@@ -900,11 +847,7 @@ class WeatherDatabaseViewer:
         
         if messagebox.askyesno("Confirm", f"Delete history record ID {record_id}?"):
             try:
-                conn = sqlite3.connect(self.db_path)
-                cursor = conn.cursor()
-                cursor.execute("DELETE FROM weather_history WHERE id = ?", (record_id,))
-                conn.commit()
-                conn.close()
+                self.repository.delete_history_record(record_id)
                 
                 self.load_history_data()
                 self.update_statistics()
@@ -923,11 +866,7 @@ class WeatherDatabaseViewer:
         
         if messagebox.askyesno("Confirm", f"Delete forecast record ID {record_id}?"):
             try:
-                conn = sqlite3.connect(self.db_path)
-                cursor = conn.cursor()
-                cursor.execute("DELETE FROM weather_forecast WHERE id = ?", (record_id,))
-                conn.commit()
-                conn.close()
+                self.repository.delete_forecast_record(record_id)
                 
                 self.load_forecast_data()
                 self.update_statistics()
@@ -946,12 +885,7 @@ class WeatherDatabaseViewer:
         
         if messagebox.askyesno("Confirm", f"Delete ALL forecast records for {city}?"):
             try:
-                conn = sqlite3.connect(self.db_path)
-                cursor = conn.cursor()
-                cursor.execute("DELETE FROM weather_forecast WHERE city = ?", (city,))
-                deleted_count = cursor.rowcount
-                conn.commit()
-                conn.close()
+                deleted_count = self.repository.delete_city_forecasts(city)
                 
                 messagebox.showinfo("Success", f"Deleted {deleted_count} forecast records for {city}")
                 self.load_forecast_data()
@@ -985,9 +919,126 @@ class WeatherDatabaseViewer:
         text_widget.insert('1.0', details)
         text_widget.config(state='disabled')
 
+class ExportWindow:
+    """Streams both tables to files on a worker thread, with progress and cancel"""
+    
+    def __init__(self, parent, repository):
+        self.repository = repository
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.future = None
+        self.cancel_requested = False
+        self.closed = False
+        self.progress_state = None
+        
+        self.window = tk.Toplevel(parent)
+        self.window.title("Export Data")
+        self.window.geometry("460x230")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        
+        # Format choice
+        format_frame = tk.LabelFrame(self.window, text="Format", font=("Arial", 12, "bold"))
+        format_frame.pack(fill='x', padx=10, pady=5)
+        
+        self.format_var = tk.StringVar(value='csv')
+        formats = [('CSV', 'csv', True), ('JSON Lines', 'jsonl', True), ('Parquet', 'parquet', parquet_available())]
+        for label, value, available in formats:
+            tk.Radiobutton(
+                format_frame,
+                text=label if available else f"{label} (needs pyarrow)",
+                variable=self.format_var,
+                value=value,
+                state='normal' if available else 'disabled',
+                font=("Arial", 10)
+            ).pack(side='left', padx=10, pady=5)
+        
+        # Progress
+        self.status_label = tk.Label(self.window, text="Choose a format and a target directory", font=("Arial", 10))
+        self.status_label.pack(fill='x', padx=10, pady=5)
+        
+        self.progress_bar = ttk.Progressbar(self.window, mode='determinate', maximum=100)
+        self.progress_bar.pack(fill='x', padx=10, pady=5)
+        
+        # Buttons
+        button_frame = tk.Frame(self.window)
+        button_frame.pack(fill='x', padx=10, pady=5)
+        
+        self.export_button = tk.Button(button_frame, text="Export...", command=self.start_export,
+                                       bg='#2196f3', fg='white', font=("Arial", 10, "bold"))
+        self.export_button.pack(side='left', padx=5)
+        
+        self.cancel_button = tk.Button(button_frame, text="Cancel", command=self.cancel_export, state='disabled',
+                                       bg='#f44336', fg='white', font=("Arial", 10, "bold"))
+        self.cancel_button.pack(side='left', padx=5)
+    
+    def start_export(self):
+        """Ask for a directory and start streaming the export in the background"""
+        directory = filedialog.askdirectory(parent=self.window, title="Select directory to save the export")
+        if not directory:
+            return
+        
+        self.cancel_requested = False
+        self.progress_state = None
+        self.progress_bar['value'] = 0
+        self.export_button.config(state='disabled')
+        self.cancel_button.config(state='normal')
+        
+        self.future = self.executor.submit(
+            export_all, self.repository, directory, self.format_var.get(),
+            progress=self.on_progress, cancelled=lambda: self.cancel_requested
+        )
+        self.window.after(100, self.poll_export)
+    
+    def on_progress(self, table, done, total):
+        # Called on the worker thread; the Tk thread picks this up in poll_export
+        self.progress_state = (table, done, total)
+    
+    def poll_export(self):
+        """Update the progress bar until the export finishes"""
+        if self.closed:
+            return
+        
+        if self.progress_state:
+            table, done, total = self.progress_state
+            self.progress_bar['value'] = done * 100 / total if total else 100
+            self.status_label.config(text=f"{table}: {done:,} / {total:,} rows")
+        
+        if not self.future.done():
+            self.window.after(100, self.poll_export)
+            return
+        
+        self.export_button.config(state='normal')
+        self.cancel_button.config(state='disabled')
+        
+        try:
+            results = self.future.result()
+        except ExportCancelled:
+            self.status_label.config(text="Export cancelled")
+            return
+        except Exception as e:
+            self.status_label.config(text="Export failed")
+            messagebox.showerror("Export Error", f"Failed to export data: {str(e)}", parent=self.window)
+            return
+        
+        self.status_label.config(text="Export complete")
+        files = "\n".join(f"• {path} ({rows:,} records)" for path, rows in results.items())
+        messagebox.showinfo("Export Complete", f"Data exported successfully!\n\nFiles created:\n{files}",
+                            parent=self.window)
+    
+    def cancel_export(self):
+        self.cancel_requested = True
+        self.status_label.config(text="Cancelling...")
+    
+    def close(self):
+        """Close the window, cancelling any export still running"""
+        self.cancel_requested = True
+        self.closed = True
+        self.executor.shutdown(wait=False)
+        self.window.destroy()
+
 class SQLQueryWindow:
     def __init__(self, parent, db_path):
         self.db_path = db_path
+        self.db = get_manager(db_path)
         
         self.window = tk.Toplevel(parent)
         self.window.title("SQL Query Tool")
@@ -1017,9 +1068,9 @@ class SQLQueryWindow:
         tk.Label(sample_frame, text="Sample Queries:", font=("Arial", 10, "bold")).pack(side='left')
         
         samples = [
-            ("All History", "SELECT * FROM weather_history ORDER BY searched_at DESC;"),
-            ("Cities by Temperature", "SELECT city, AVG(temperature) as avg_temp FROM weather_history GROUP BY city ORDER BY avg_temp DESC;"),
-            ("Recent Searches", "SELECT city, searched_at FROM weather_history ORDER BY searched_at DESC LIMIT 10;")
+            ("All History", "SELECT * FROM weather_history_all ORDER BY searched_at DESC;"),
+            ("Cities by Temperature", "SELECT city, AVG(temperature) as avg_temp FROM weather_history_all GROUP BY city ORDER BY avg_temp DESC;"),
+            ("Recent Searches", "SELECT city, searched_at FROM weather_history_all ORDER BY searched_at DESC LIMIT 10;")
         ]
         
         for name, query in samples:
@@ -1045,14 +1096,12 @@ class SQLQueryWindow:
             return
         
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute(query)
-            
             if query.strip().upper().startswith('SELECT'):
-                results = cursor.fetchall()
-                column_names = [description[0] for description in cursor.description]
+                # SELECTs run on a pooled reader so they never wait on the app's writes
+                with self.db.reader() as conn:
+                    cursor = conn.execute(query)
+                    results = cursor.fetchall()
+                    column_names = [description[0] for description in cursor.description]
                 
                 # Format results
                 output = f"Query executed successfully!\n"
@@ -1072,11 +1121,11 @@ class SQLQueryWindow:
                 else:
                     output += "No results found.\n"
             else:
-                conn.commit()
+                with self.db.writer() as conn:
+                    cursor = conn.execute(query)
+                    conn.commit()
                 output = f"Query executed successfully!\nRows affected: {cursor.rowcount}"
             
-            conn.close()
-            
             self.result_text.delete('1.0', tk.END)
             self.result_text.insert('1.0', output)
             
@@ -0,0 +1,151 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+DEFAULT_PRAGMAS = {
+    'synchronous': 'NORMAL',      # safe with WAL; fsync only at checkpoints
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -16000,         # negative = KiB, so ~16 MB page cache per connection
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000
+}
+
+class ConnectionManager:
+    """One writer connection and a pool of reader connections to a WAL-mode database
+    
+    In WAL mode readers work from a snapshot and never wait for the writer,
+    so the GUI, the viewer and the server can read while the app is saving.
+    Writes are serialised through a single connection guarded by a lock.
+    """
+    
+    def __init__(self, db_path='weather_forecast_real.db', max_readers=4, pragmas=None):
+        self.db_path = db_path
+        self.max_readers = max_readers
+        self.pragmas = dict(DEFAULT_PRAGMAS, **(pragmas or {}))
+        
+        self.write_conn = None
+        self.write_lock = threading.RLock()
+        self.idle_readers = queue.LifoQueue()
+        self.reader_slots = threading.BoundedSemaphore(max_readers)
+        self.wal_lock = threading.Lock()
+        self.wal_ready = False
+    
+    def ensure_wal(self):
+        """Switch an existing database file to WAL once, without the write lock
+        
+        WAL mode is stored in the file, so readers never have to go through the
+        writer (and wait for its lock) to get it. A missing file is left alone
+        rather than created; the writer's connection sets WAL when it makes one.
+        """
+        with self.wal_lock:
+            if self.wal_ready or not os.path.exists(self.db_path):
+                return
+            conn = sqlite3.connect(self.db_path, timeout=self.pragmas['busy_timeout'] / 1000)
+            try:
+                conn.execute('PRAGMA journal_mode=WAL')
+            finally:
+                conn.close()
+            self.wal_ready = True
+    
+    def connect(self, read_only=False):
+        """Open a connection with WAL and the tuned PRAGMAs applied"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        if not read_only:
+            conn.execute('PRAGMA journal_mode=WAL')
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name}={value}')
+        if read_only:
+            conn.execute('PRAGMA query_only=ON')
+        return conn
+    
+    def writer_connection(self):
+        """The long-lived writer connection; callers must hold write_lock"""
+        if self.write_conn is None:
+            self.write_conn = self.connect()
+        return self.write_conn
+    
+    @contextmanager
+    def writer(self):
+        """Exclusive use of the writer connection"""
+        with self.write_lock:
+            yield self.writer_connection()
+    
+    @contextmanager
+    def reader(self):
+        """Borrow a read-only connection from the pool"""
+        self.reader_slots.acquire()
+        try:
+            try:
+                conn = self.idle_readers.get_nowait()
+            except queue.Empty:
+                self.ensure_wal()
+                conn = self.connect(read_only=True)
+            
+            try:
+                yield conn
+            finally:
+                if conn.in_transaction:
+                    conn.rollback()
+                self.idle_readers.put(conn)
+        finally:
+            self.reader_slots.release()
+    
+    @contextmanager
+    def snapshot(self):
+        """A pooled reader inside one read transaction, so several queries see the same data"""
+        with self.reader() as conn:
+            conn.execute('BEGIN')
+            yield conn
+    
+    def read(self, sql, params=(), cancelled=None):
+        """Run a query on a pooled reader and return all rows
+        
+        cancelled is an optional callable polled while the query runs; when
+        it returns True the query is aborted with sqlite3.OperationalError.
+        """
+        with self.reader() as conn:
+            return self.query(conn, sql, params, cancelled)
+    
+    @staticmethod
+    def query(conn, sql, params=(), cancelled=None):
+        """Run a query on a borrowed connection, like read()"""
+        if cancelled is None:
+            return conn.execute(sql, params).fetchall()
+        
+        conn.set_progress_handler(lambda: 1 if cancelled() else 0, 1000)
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.set_progress_handler(None, 1000)
+    
+    def checkpoint(self, mode='PASSIVE'):
+        """Fold the WAL back into the main database file"""
+        with self.writer() as conn:
+            return conn.execute(f'PRAGMA wal_checkpoint({mode})').fetchone()
+    
+    def close(self):
+        """Close idle connections; they are reopened on next use"""
+        while True:
+            try:
+                self.idle_readers.get_nowait().close()
+            except queue.Empty:
+                break
+        
+        with self.write_lock:
+            if self.write_conn is not None:
+                self.write_conn.close()
+                self.write_conn = None
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+def get_manager(db_path='weather_forecast_real.db'):
+    """Process-wide ConnectionManager for a database file"""
+    key = os.path.abspath(db_path)
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = _managers[key] = ConnectionManager(db_path)
+        return manager
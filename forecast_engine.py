@@ -0,0 +1,93 @@
+from collections import Counter
+from datetime import date, timedelta
+
+from weather_client import get_weather_icon
+
+EPOCH = date(1970, 1, 1)
+SECONDS_PER_DAY = 86400
+
+class DailyAggregate:
+    """Running aggregates for one local calendar day of 3-hourly forecast items"""
+    
+    __slots__ = ('date', 'count', 'high', 'low', 'temp_sum', 'humidity_sum', 'humidity_count',
+                 'wind_max', 'pop_max', 'conditions', 'descriptions')
+    
+    def __init__(self, day):
+        self.date = day
+        self.count = 0
+        self.high = float('-inf')
+        self.low = float('inf')
+        self.temp_sum = 0.0
+        self.humidity_sum = 0
+        self.humidity_count = 0
+        self.wind_max = 0.0
+        self.pop_max = 0.0
+        self.conditions = Counter()
+        self.descriptions = Counter()
+    
+    def add(self, item):
+        main = item['main']
+        temp = main['temp']
+        self.count += 1
+        self.temp_sum += temp
+        if temp > self.high:
+            self.high = temp
+        if temp < self.low:
+            self.low = temp
+        
+        humidity = main.get('humidity')
+        if humidity is not None:
+            self.humidity_sum += humidity
+            self.humidity_count += 1
+        
+        wind = item.get('wind', {}).get('speed')
+        if wind is not None and wind > self.wind_max:
+            self.wind_max = wind
+        
+        pop = item.get('pop')
+        if pop is not None and pop > self.pop_max:
+            self.pop_max = pop
+        
+        weather = item['weather'][0]
+        self.conditions[weather['main']] += 1
+        description = weather.get('description')
+        if description:
+            self.descriptions[description] += 1
+    
+    def to_record(self):
+        condition = self.conditions.most_common(1)[0][0]
+        description = self.descriptions.most_common(1)[0][0].title() if self.descriptions else condition
+        return {
+            'day': self.date.strftime('%a'),
+            'date': self.date,
+            'high': round(self.high, 1),
+            'low': round(self.low, 1),
+            'condition': condition,
+            'icon': get_weather_icon(condition),
+            'description': description,
+            'mean_temp': round(self.temp_sum / self.count, 1),
+            'humidity': round(self.humidity_sum / self.humidity_count) if self.humidity_count else None,
+            'wind_speed': round(self.wind_max * 3.6, 1),
+            'precipitation_chance': round(self.pop_max * 100)
+        }
+
+def aggregate_forecast(data, days=7):
+    """Aggregate a 3-hourly /forecast response into daily records in one pass
+    
+    Items are grouped by calendar day in the city's own timezone (the
+    response's 'timezone' offset in seconds), not the machine's local time.
+    The dominant condition is the most frequent one, counted with a Counter.
+    """
+    offset = data.get('city', {}).get('timezone', 0) or 0
+    daily = {}
+    
+    for item in data['list']:
+        day_index = (item['dt'] + offset) // SECONDS_PER_DAY
+        aggregate = daily.get(day_index)
+        if aggregate is None:
+            if len(daily) == days:
+                continue
+            aggregate = daily[day_index] = DailyAggregate(EPOCH + timedelta(days=day_index))
+        aggregate.add(item)
+    
+    return [aggregate.to_record() for aggregate in daily.values()]
@@ -0,0 +1,45 @@
+from weather_client import get_weather_icon
+
+def forecast_card_text(day):
+    """The text each label of a forecast card shows for one forecast day"""
+    return {
+        'day': day['day'],
+        'icon': day.get('icon') or get_weather_icon(day['condition']),
+        'high': f"{day['high']}°C",
+        'low': f"{day['low']}°C",
+        'condition': day['condition']
+    }
+
+class ForecastViewModel:
+    """Remembers what each forecast card shows and works out what a new forecast changes
+    
+    diff() compares a new forecast with the text already on screen and
+    returns only the (card index, field, text) changes, so the Tk labels
+    that would show the same text are not reconfigured. Days whose record
+    is unchanged are skipped without building their text at all. Cards past
+    the end of a shorter forecast are blanked.
+    """
+    
+    def __init__(self, cards=7):
+        self.records = [None] * cards
+        self.shown = [{} for _ in range(cards)]
+    
+    def diff(self, forecast_data):
+        changes = []
+        for index in range(len(self.records)):
+            if index < len(forecast_data):
+                day = forecast_data[index]
+                if day == self.records[index]:
+                    continue
+                self.records[index] = dict(day)
+                texts = forecast_card_text(day)
+            else:
+                self.records[index] = None
+                texts = dict.fromkeys(('day', 'icon', 'high', 'low', 'condition'), '')
+            
+            shown = self.shown[index]
+            for field, text in texts.items():
+                if shown.get(field) != text:
+                    shown[field] = text
+                    changes.append((index, field, text))
+        return changes
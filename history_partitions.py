@@ -0,0 +1,268 @@
+import os
+
+from schema_migrations import HISTORY_STORED_COLUMNS, HISTORY_VIEW, ROLLUP_REMOVE_SQL, create_history_view
+
+# period -> (modifier for the start of a period, unit to step by, name suffix format)
+PARTITION_PERIODS = {
+    'month': ('start of month', 'months', '%Y_%m'),
+    'day': ('start of day', 'days', '%Y_%m_%d')
+}
+
+PARTITION_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY,
+        city TEXT NOT NULL,
+        country TEXT,
+        temperature REAL NOT NULL,
+        condition TEXT NOT NULL,
+        description TEXT,
+        humidity INTEGER,
+        wind_speed REAL,
+        pressure INTEGER,
+        feels_like REAL,
+        visibility INTEGER,
+        uv_index REAL,
+        searched_at TIMESTAMP
+    )
+'''
+
+STORED_COLUMNS = ', '.join(HISTORY_STORED_COLUMNS)
+
+def live_partitions(conn, start=None, end=None):
+    """Names of the partitions overlapping [start, end), newest first; None leaves a side open"""
+    return [row[0] for row in conn.execute('''
+        SELECT name FROM history_partitions
+        WHERE archive_path IS NULL
+          AND (? IS NULL OR range_end > ?)
+          AND (? IS NULL OR range_start < ?)
+        ORDER BY range_start DESC
+    ''', (start, start, end, end))]
+
+def expired_partitions(conn, before):
+    """Live partitions that end on or before the given timestamp, oldest first"""
+    return [row[0] for row in conn.execute('''
+        SELECT name FROM history_partitions
+        WHERE archive_path IS NULL AND range_end <= ?
+        ORDER BY range_start
+    ''', (before,))]
+
+def create_partition(conn, name):
+    conn.execute(PARTITION_TABLE_SQL.format(name=name))
+    conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{name}_searched_at ON {name}(searched_at)')
+    conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{name}_city_nocase ON {name}(city COLLATE NOCASE, searched_at)')
+    # Deleting a single sealed row (from the viewer) still updates the rollups
+    conn.execute(
+        f'CREATE TRIGGER IF NOT EXISTS {name}_stats_delete AFTER DELETE ON {name} BEGIN'
+        + ROLLUP_REMOVE_SQL.format(row='old', history=HISTORY_VIEW) + 'END'
+    )
+
+def move_rows(conn, name, range_start, range_end):
+    """Move weather_history rows in [range_start, range_end) into a partition; returns rows moved
+    
+    The live table's stats delete trigger is suspended for the move, so the
+    rows stay counted in city_stats and condition_stats. Runs inside the
+    caller's transaction.
+    """
+    trigger_sql = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'weather_history_stats_delete'"
+    ).fetchone()
+    conn.execute('DROP TRIGGER IF EXISTS weather_history_stats_delete')
+    
+    moved = conn.execute(f'''
+        INSERT INTO {name} ({STORED_COLUMNS})
+        SELECT {STORED_COLUMNS} FROM weather_history WHERE searched_at >= ? AND searched_at < ?
+    ''', (range_start, range_end)).rowcount
+    conn.execute('DELETE FROM weather_history WHERE searched_at >= ? AND searched_at < ?', (range_start, range_end))
+    
+    if trigger_sql:
+        conn.execute(trigger_sql[0])
+    return moved
+
+def drop_partition(conn, name, archive_path=None):
+    """Drop a partition's table and take its rows out of the rollups
+    
+    Runs inside the caller's transaction. The rows are read once, grouped,
+    to adjust the rollups; the table itself goes with a DROP TABLE instead of
+    a per-row DELETE. With archive_path the registry entry is kept and points
+    at the archived copy.
+    """
+    range_end = conn.execute('SELECT range_end FROM history_partitions WHERE name = ?', (name,)).fetchone()[0]
+    
+    conn.execute('DROP TABLE IF EXISTS temp.dropped_city_stats')
+    conn.execute(f'''
+        CREATE TEMP TABLE dropped_city_stats AS
+        SELECT city, COUNT(*) AS searches, TOTAL(temperature) AS temp_sum,
+               MIN(temperature) AS temp_min, MAX(temperature) AS temp_max,
+               TOTAL(humidity) AS humidity_sum, COUNT(humidity) AS humidity_count,
+               TOTAL(wind_speed) AS wind_sum, COUNT(wind_speed) AS wind_count,
+               TOTAL(pressure) AS pressure_sum, COUNT(pressure) AS pressure_count
+        FROM {name} GROUP BY city
+    ''')
+    conn.execute('DROP TABLE IF EXISTS temp.dropped_condition_stats')
+    conn.execute(f'''
+        CREATE TEMP TABLE dropped_condition_stats AS
+        SELECT condition, COUNT(*) AS searches FROM {name} GROUP BY condition
+    ''')
+    
+    conn.execute(f'DROP TABLE {name}')
+    if archive_path is None:
+        conn.execute('DELETE FROM history_partitions WHERE name = ?', (name,))
+    else:
+        conn.execute('UPDATE history_partitions SET archive_path = ? WHERE name = ?', (archive_path, name))
+    create_history_view(conn, live_partitions(conn))
+    
+    # Extremes are only recomputed where the dropped rows could have held them
+    conn.execute(f'''
+        UPDATE city_stats SET
+            search_count = city_stats.search_count - d.searches,
+            temp_sum = city_stats.temp_sum - d.temp_sum,
+            humidity_sum = city_stats.humidity_sum - d.humidity_sum,
+            humidity_count = city_stats.humidity_count - d.humidity_count,
+            wind_sum = city_stats.wind_sum - d.wind_sum,
+            wind_count = city_stats.wind_count - d.wind_count,
+            pressure_sum = city_stats.pressure_sum - d.pressure_sum,
+            pressure_count = city_stats.pressure_count - d.pressure_count,
+            temp_min = CASE WHEN d.temp_min <= city_stats.temp_min THEN (
+                SELECT MIN(temperature) FROM {HISTORY_VIEW}
+                WHERE city = d.city COLLATE NOCASE AND city = d.city
+            ) ELSE city_stats.temp_min END,
+            temp_max = CASE WHEN d.temp_max >= city_stats.temp_max THEN (
+                SELECT MAX(temperature) FROM {HISTORY_VIEW}
+                WHERE city = d.city COLLATE NOCASE AND city = d.city
+            ) ELSE city_stats.temp_max END,
+            last_seen = CASE WHEN city_stats.last_seen < ? THEN (
+                SELECT MAX(searched_at) FROM {HISTORY_VIEW}
+                WHERE city = d.city COLLATE NOCASE AND city = d.city
+            ) ELSE city_stats.last_seen END
+        FROM temp.dropped_city_stats AS d
+        WHERE city_stats.city = d.city
+    ''', (range_end,))
+    conn.execute('DELETE FROM city_stats WHERE search_count <= 0')
+    
+    conn.execute(f'''
+        UPDATE condition_stats SET
+            search_count = condition_stats.search_count - d.searches,
+            last_seen = CASE WHEN condition_stats.last_seen < ? THEN (
+                SELECT MAX(searched_at) FROM {HISTORY_VIEW} WHERE condition = d.condition
+            ) ELSE condition_stats.last_seen END
+        FROM temp.dropped_condition_stats AS d
+        WHERE condition_stats.condition = d.condition
+    ''', (range_end,))
+    conn.execute('DELETE FROM condition_stats WHERE search_count <= 0')
+
+class HistoryPartitions:
+    """Seals old history into per-period tables that queries can skip and drop cheaply
+    
+    weather_history stays the live partition every save goes to. seal()
+    moves each complete period older than hot_periods into its own table
+    (weather_history_p2026_07 for July 2026 with monthly periods) and records
+    it in history_partitions, which the repository reads to route time-range
+    queries to the overlapping partitions only. weather_history_all is a
+    UNION ALL view over all of them for ad-hoc SQL.
+    """
+    
+    def __init__(self, repository, period='month', hot_periods=1):
+        if period not in PARTITION_PERIODS:
+            raise ValueError(f"Unknown partition period {period!r}; use {' or '.join(PARTITION_PERIODS)}")
+        if hot_periods < 1:
+            raise ValueError("hot_periods must be at least 1")
+        self.repository = repository
+        self.period = period
+        self.hot_periods = hot_periods
+    
+    def partitions(self):
+        """Registry rows as (name, range_start, range_end, row_count, archive_path), oldest first"""
+        return self.repository.execute('''
+            SELECT name, range_start, range_end, row_count, archive_path
+            FROM history_partitions ORDER BY range_start
+        ''')
+    
+    def seal(self):
+        """Move every complete period older than the hot window out of weather_history
+        
+        Each period is moved in its own transaction, taking the writer only
+        for that period, so saves interleave with a long seal. Returns rows
+        moved.
+        """
+        start_modifier, unit, name_format = PARTITION_PERIODS[self.period]
+        moved = 0
+        
+        with self.repository.db.snapshot() as conn:
+            cutoff = conn.execute(
+                "SELECT datetime('now', ?, ?)", (start_modifier, f'-{self.hot_periods - 1} {unit}')
+            ).fetchone()[0]
+            periods = conn.execute(f'''
+                SELECT DISTINCT datetime(searched_at, ?) AS range_start,
+                       datetime(searched_at, ?, '+1 {unit}') AS range_end,
+                       'weather_history_p' || strftime(?, searched_at) AS name
+                FROM weather_history WHERE searched_at < ?
+            ''', (start_modifier, start_modifier, name_format, cutoff)).fetchall()
+            archived = {row[0] for row in conn.execute(
+                'SELECT name FROM history_partitions WHERE archive_path IS NOT NULL'
+            )}
+        
+        for range_start, range_end, name in sorted(periods):
+            if name in archived:
+                # Late rows for an archived period stay in the live table
+                continue
+            with self.repository.db.writer() as conn:
+                with conn:
+                    create_partition(conn, name)
+                    count = move_rows(conn, name, range_start, range_end)
+                    conn.execute('''
+                        INSERT INTO history_partitions (name, range_start, range_end, row_count)
+                        VALUES (?, ?, ?, ?)
+                        ON CONFLICT(name) DO UPDATE SET
+                            row_count = row_count + excluded.row_count,
+                            sealed_at = CURRENT_TIMESTAMP
+                    ''', (name, range_start, range_end, count))
+                    create_history_view(conn, live_partitions(conn))
+            moved += count
+            print(f"📦 Sealed {count} history rows into {name}")
+        
+        return moved
+    
+    def drop(self, name):
+        """Delete a partition and every row in it"""
+        with self.repository.db.writer() as conn:
+            with conn:
+                self.check_live(conn, name)
+                drop_partition(conn, name)
+        print(f"🗑️ Dropped history partition {name}")
+    
+    def archive(self, name, directory):
+        """Copy a partition into its own database file, then drop it here; returns the file path
+        
+        The archive holds one weather_history table and can be opened or
+        attached like any other weather database.
+        """
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.abspath(os.path.join(directory, f"{name}.db"))
+        if os.path.exists(path):
+            raise FileExistsError(f"Archive {path} already exists")
+        
+        with self.repository.db.writer() as conn:
+            self.check_live(conn, name)
+            conn.execute('ATTACH DATABASE ? AS archive', (path,))
+            try:
+                with conn:
+                    conn.execute(PARTITION_TABLE_SQL.format(name='archive.weather_history'))
+                    conn.execute(f'''
+                        INSERT INTO archive.weather_history ({STORED_COLUMNS})
+                        SELECT {STORED_COLUMNS} FROM main.{name}
+                    ''')
+            finally:
+                conn.execute('DETACH DATABASE archive')
+            
+            with conn:
+                drop_partition(conn, name, archive_path=path)
+        
+        print(f"🗄️ Archived history partition {name} to {path}")
+        return path
+    
+    @staticmethod
+    def check_live(conn, name):
+        if not conn.execute(
+            'SELECT 1 FROM history_partitions WHERE name = ? AND archive_path IS NULL', (name,)
+        ).fetchone():
+            raise ValueError(f"No live history partition named {name!r}")
@@ -0,0 +1,129 @@
+import threading
+import time
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate  # tokens added per second
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+    
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def seconds_until_available(self, now):
+        """Seconds until one token can be taken"""
+        self.refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+class TokenBucketRateLimiter:
+    """Client-side quota for OpenWeather calls
+    
+    Callers queue in FIFO order until both the per-minute and (optional)
+    per-day buckets have a token, so bursts up to the quota go straight
+    through and anything beyond waits instead of failing upstream.
+    """
+    
+    def __init__(self, calls_per_minute=60, calls_per_day=None, burst=None):
+        self.calls_per_minute = calls_per_minute
+        self.calls_per_day = calls_per_day
+        
+        self.buckets = [TokenBucket(calls_per_minute / 60.0, burst or calls_per_minute)]
+        if calls_per_day:
+            self.buckets.append(TokenBucket(calls_per_day / 86400.0, calls_per_day))
+        
+        self.condition = threading.Condition()
+        self.next_ticket = 0
+        self.now_serving = 0
+        
+        self.queue_depth = 0
+        self.calls = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.last_wait = 0.0
+    
+    def acquire(self):
+        """Block until a call is allowed"""
+        start = time.monotonic()
+        
+        with self.condition:
+            ticket = self.next_ticket
+            self.next_ticket += 1
+            self.queue_depth += 1
+            
+            try:
+                while True:
+                    timeout = None
+                    if ticket == self.now_serving:
+                        now = time.monotonic()
+                        timeout = max(bucket.seconds_until_available(now) for bucket in self.buckets)
+                        if timeout <= 0:
+                            for bucket in self.buckets:
+                                bucket.tokens -= 1
+                            self.now_serving += 1
+                            self.condition.notify_all()
+                            break
+                    self.condition.wait(timeout)
+            finally:
+                self.queue_depth -= 1
+            
+            waited = time.monotonic() - start
+            self.calls += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+            self.last_wait = waited
+        
+        return waited
+    
+    def try_acquire(self):
+        """Take a call's tokens only if nobody is queued and they are available now
+        
+        Returns False instead of waiting, for background callers that should
+        never hold up interactive ones or block shutdown.
+        """
+        with self.condition:
+            if self.queue_depth:
+                return False
+            now = time.monotonic()
+            if any(bucket.seconds_until_available(now) > 0 for bucket in self.buckets):
+                return False
+            for bucket in self.buckets:
+                bucket.tokens -= 1
+            self.calls += 1
+            self.last_wait = 0.0
+            return True
+    
+    def stats(self):
+        """Return queue depth, wait times and remaining tokens"""
+        with self.condition:
+            now = time.monotonic()
+            for bucket in self.buckets:
+                bucket.refill(now)
+            return {
+                'queue_depth': self.queue_depth,
+                'calls': self.calls,
+                'avg_wait': self.total_wait / self.calls if self.calls else 0.0,
+                'max_wait': self.max_wait,
+                'last_wait': self.last_wait,
+                'minute_tokens': self.buckets[0].tokens,
+                'day_tokens': self.buckets[1].tokens if self.calls_per_day else None
+            }
+
+# Free tier defaults for the 2.5 /weather and /forecast endpoints: 60 calls/minute
+# and about 1,000,000 calls/month, which needs no daily bucket of its own
+_shared_limiter = None
+_shared_lock = threading.Lock()
+
+def get_shared_limiter(calls_per_minute=60, calls_per_day=None):
+    """Return the process-wide limiter shared by every fetch path
+    
+    The limits only apply the first time this is called.
+    """
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            _shared_limiter = TokenBucketRateLimiter(calls_per_minute, calls_per_day)
+        return _shared_limiter
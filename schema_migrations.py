@@ -0,0 +1,529 @@
+import os
+import sqlite3
+from contextlib import contextmanager
+
+HISTORY_EXTRA_COLUMNS = (
+    ('country', 'TEXT'),
+    ('description', 'TEXT'),
+    ('pressure', 'INTEGER'),
+    ('feels_like', 'REAL'),
+    ('visibility', 'INTEGER'),
+    ('uv_index', 'REAL')
+)
+
+FORECAST_EXTRA_COLUMNS = (
+    ('description', 'TEXT'),
+    ('humidity', 'INTEGER'),
+    ('wind_speed', 'REAL'),
+    ('precipitation_chance', 'INTEGER')
+)
+
+def table_columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+def add_missing_columns(conn, table, columns):
+    existing = table_columns(conn, table)
+    for name, column_type in columns:
+        if name not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}")
+
+def create_tables(conn):
+    """v1: the weather_history and weather_forecast tables"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS weather_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            city TEXT NOT NULL,
+            temperature REAL NOT NULL,
+            condition TEXT NOT NULL,
+            humidity INTEGER,
+            wind_speed REAL,
+            searched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS weather_forecast (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            city TEXT NOT NULL,
+            day_name TEXT NOT NULL,
+            forecast_date DATE,
+            high_temp REAL NOT NULL,
+            low_temp REAL NOT NULL,
+            condition TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+def add_viewer_columns(conn):
+    """v2: the columns the viewer and checker expect but the app never created"""
+    add_missing_columns(conn, 'weather_history', HISTORY_EXTRA_COLUMNS)
+    add_missing_columns(conn, 'weather_forecast', FORECAST_EXTRA_COLUMNS)
+
+def unique_forecast_day(conn):
+    """v3: one forecast row per city and day, so saves can UPSERT"""
+    conn.execute('''
+        DELETE FROM weather_forecast WHERE id NOT IN (
+            SELECT MAX(id) FROM weather_forecast GROUP BY city, forecast_date
+        )
+    ''')
+    conn.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_weather_forecast_city_date
+        ON weather_forecast(city, forecast_date)
+    ''')
+
+def query_indexes(conn):
+    """v4: indexes for the app's hot queries
+    
+    idx_weather_history_recent covers the history cards query
+    (ORDER BY searched_at DESC LIMIT 12) without touching the table.
+    idx_weather_history_city_nocase serves city = ? COLLATE NOCASE and
+    prefix LIKE filters, newest first. DELETE ... WHERE city = ? on the
+    forecast table uses the leading column of idx_weather_forecast_city_date,
+    so the checker's single-column indexes that duplicate a prefix of these
+    are dropped to keep writes cheap.
+    """
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_weather_history_recent
+        ON weather_history(searched_at, city, temperature, condition)
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_weather_history_city_nocase
+        ON weather_history(city COLLATE NOCASE, searched_at)
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_weather_forecast_date
+        ON weather_forecast(forecast_date)
+    ''')
+    conn.execute('DROP INDEX IF EXISTS idx_weather_history_city')
+    conn.execute('DROP INDEX IF EXISTS idx_weather_history_date')
+    conn.execute('DROP INDEX IF EXISTS idx_weather_forecast_city')
+
+def history_paging_index(conn):
+    """v5: (searched_at, id) order for keyset pagination of the viewer's history grid
+    
+    It replaces v4's idx_weather_history_recent: both lead with searched_at,
+    but only this one keeps ties in id order, and the history cards read 12
+    rows newest first through either, so inserts maintain one of them.
+    """
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_weather_history_searched_at
+        ON weather_history(searched_at)
+    ''')
+    conn.execute('DROP INDEX IF EXISTS idx_weather_history_recent')
+
+HISTORY_SEARCH_TRIGGERS = {
+    'weather_history_fts_insert': '''
+        CREATE TRIGGER IF NOT EXISTS weather_history_fts_insert AFTER INSERT ON weather_history BEGIN
+            INSERT INTO weather_history_fts (rowid, city, country, description)
+            VALUES (new.id, new.city, new.country, new.description);
+        END
+    ''',
+    'weather_history_fts_delete': '''
+        CREATE TRIGGER IF NOT EXISTS weather_history_fts_delete AFTER DELETE ON weather_history BEGIN
+            INSERT INTO weather_history_fts (weather_history_fts, rowid, city, country, description)
+            VALUES ('delete', old.id, old.city, old.country, old.description);
+        END
+    ''',
+    'weather_history_fts_update': '''
+        CREATE TRIGGER IF NOT EXISTS weather_history_fts_update
+        AFTER UPDATE OF city, country, description ON weather_history BEGIN
+            INSERT INTO weather_history_fts (weather_history_fts, rowid, city, country, description)
+            VALUES ('delete', old.id, old.city, old.country, old.description);
+            INSERT INTO weather_history_fts (rowid, city, country, description)
+            VALUES (new.id, new.city, new.country, new.description);
+        END
+    '''
+}
+
+def history_search_index(conn):
+    """v6: trigram full-text index over city/country/description, kept in sync by triggers
+    
+    Needs SQLite 3.34+ built with FTS5; without it the history filter keeps
+    using the prefix LIKE on idx_weather_history_city_nocase.
+    """
+    try:
+        conn.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS weather_history_fts USING fts5(
+                city, country, description,
+                content='weather_history', content_rowid='id', tokenize='trigram'
+            )
+        ''')
+    except sqlite3.OperationalError as e:
+        print(f"⚠️ Full-text history search unavailable ({e}); using prefix matching")
+        return
+    
+    for sql in HISTORY_SEARCH_TRIGGERS.values():
+        conn.execute(sql)
+    conn.execute("INSERT INTO weather_history_fts (weather_history_fts) VALUES ('rebuild')")
+
+# Rollup maintenance shared by the insert/delete/update triggers; {row} is
+# new or old. Removing a row that held a city's min/max/last_seen recomputes
+# that value from the city's rows in {history} through the city indexes.
+ROLLUP_ADD_SQL = '''
+    INSERT INTO city_stats (city, search_count, temp_sum, temp_min, temp_max,
+                            humidity_sum, humidity_count, wind_sum, wind_count,
+                            pressure_sum, pressure_count, last_seen)
+    VALUES ({row}.city, 1, {row}.temperature, {row}.temperature, {row}.temperature,
+            coalesce({row}.humidity, 0), {row}.humidity IS NOT NULL,
+            coalesce({row}.wind_speed, 0), {row}.wind_speed IS NOT NULL,
+            coalesce({row}.pressure, 0), {row}.pressure IS NOT NULL, {row}.searched_at)
+    ON CONFLICT(city) DO UPDATE SET
+        search_count = search_count + 1,
+        temp_sum = temp_sum + excluded.temp_sum,
+        temp_min = min(temp_min, excluded.temp_min),
+        temp_max = max(temp_max, excluded.temp_max),
+        humidity_sum = humidity_sum + excluded.humidity_sum,
+        humidity_count = humidity_count + excluded.humidity_count,
+        wind_sum = wind_sum + excluded.wind_sum,
+        wind_count = wind_count + excluded.wind_count,
+        pressure_sum = pressure_sum + excluded.pressure_sum,
+        pressure_count = pressure_count + excluded.pressure_count,
+        last_seen = CASE WHEN last_seen IS NULL OR excluded.last_seen > last_seen
+                         THEN excluded.last_seen ELSE last_seen END;
+    INSERT INTO condition_stats (condition, search_count, last_seen)
+    VALUES ({row}.condition, 1, {row}.searched_at)
+    ON CONFLICT(condition) DO UPDATE SET
+        search_count = search_count + 1,
+        last_seen = CASE WHEN last_seen IS NULL OR excluded.last_seen > last_seen
+                         THEN excluded.last_seen ELSE last_seen END;
+'''
+
+ROLLUP_REMOVE_SQL = '''
+    DELETE FROM city_stats WHERE city = {row}.city AND search_count <= 1;
+    UPDATE city_stats SET
+        search_count = search_count - 1,
+        temp_sum = temp_sum - {row}.temperature,
+        humidity_sum = humidity_sum - coalesce({row}.humidity, 0),
+        humidity_count = humidity_count - ({row}.humidity IS NOT NULL),
+        wind_sum = wind_sum - coalesce({row}.wind_speed, 0),
+        wind_count = wind_count - ({row}.wind_speed IS NOT NULL),
+        pressure_sum = pressure_sum - coalesce({row}.pressure, 0),
+        pressure_count = pressure_count - ({row}.pressure IS NOT NULL),
+        temp_min = CASE WHEN {row}.temperature <= temp_min THEN (
+            SELECT MIN(temperature) FROM {history}
+            WHERE city = {row}.city COLLATE NOCASE AND city = {row}.city
+        ) ELSE temp_min END,
+        temp_max = CASE WHEN {row}.temperature >= temp_max THEN (
+            SELECT MAX(temperature) FROM {history}
+            WHERE city = {row}.city COLLATE NOCASE AND city = {row}.city
+        ) ELSE temp_max END,
+        last_seen = CASE WHEN {row}.searched_at >= last_seen THEN (
+            SELECT MAX(searched_at) FROM {history}
+            WHERE city = {row}.city COLLATE NOCASE AND city = {row}.city
+        ) ELSE last_seen END
+    WHERE city = {row}.city;
+    DELETE FROM condition_stats WHERE condition = {row}.condition AND search_count <= 1;
+    UPDATE condition_stats SET
+        search_count = search_count - 1,
+        last_seen = CASE WHEN {row}.searched_at >= last_seen THEN (
+            SELECT MAX(searched_at) FROM {history} WHERE condition = {row}.condition
+        ) ELSE last_seen END
+    WHERE condition = {row}.condition;
+'''
+
+def rollup_triggers(history='weather_history'):
+    """Trigger bodies keeping the rollups in step with weather_history
+    
+    history is where removed extremes are recomputed from: weather_history
+    itself, or weather_history_all once history is partitioned.
+    """
+    remove_old = ROLLUP_REMOVE_SQL.format(row='old', history=history)
+    return {
+        'weather_history_stats_insert':
+            'AFTER INSERT ON weather_history BEGIN' + ROLLUP_ADD_SQL.format(row='new') + 'END',
+        'weather_history_stats_delete':
+            'AFTER DELETE ON weather_history BEGIN' + remove_old + 'END',
+        'weather_history_stats_update':
+            'AFTER UPDATE OF city, temperature, condition, humidity, wind_speed, pressure, searched_at '
+            'ON weather_history BEGIN' + remove_old + ROLLUP_ADD_SQL.format(row='new') + 'END'
+    }
+
+def rebuild_rollups(conn):
+    """Recompute city_stats and condition_stats from every stored history row"""
+    views = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'view'")}
+    source = HISTORY_VIEW if HISTORY_VIEW in views else 'weather_history'
+    
+    conn.execute('DELETE FROM city_stats')
+    conn.execute('DELETE FROM condition_stats')
+    conn.execute(f'''
+        INSERT INTO city_stats
+        SELECT city, COUNT(*), SUM(temperature), MIN(temperature), MAX(temperature),
+               TOTAL(humidity), COUNT(humidity), TOTAL(wind_speed), COUNT(wind_speed),
+               TOTAL(pressure), COUNT(pressure), MAX(searched_at)
+        FROM {source} GROUP BY city
+    ''')
+    conn.execute(f'''
+        INSERT INTO condition_stats
+        SELECT condition, COUNT(*), MAX(searched_at) FROM {source} GROUP BY condition
+    ''')
+
+def history_rollups(conn):
+    """v7: per-city and per-condition statistics maintained by triggers"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS city_stats (
+            city TEXT PRIMARY KEY,
+            search_count INTEGER NOT NULL,
+            temp_sum REAL NOT NULL,
+            temp_min REAL,
+            temp_max REAL,
+            humidity_sum REAL NOT NULL,
+            humidity_count INTEGER NOT NULL,
+            wind_sum REAL NOT NULL,
+            wind_count INTEGER NOT NULL,
+            pressure_sum REAL NOT NULL,
+            pressure_count INTEGER NOT NULL,
+            last_seen TIMESTAMP
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS condition_stats (
+            condition TEXT PRIMARY KEY,
+            search_count INTEGER NOT NULL,
+            last_seen TIMESTAMP
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_city_stats_count ON city_stats(search_count)')
+    
+    for name, body in rollup_triggers().items():
+        conn.execute(f'CREATE TRIGGER IF NOT EXISTS {name} {body}')
+    rebuild_rollups(conn)
+
+def aggregate_table_sql(table):
+    return f'''
+        CREATE TABLE IF NOT EXISTS {table} (
+            city TEXT NOT NULL,
+            bucket TIMESTAMP NOT NULL,
+            samples INTEGER NOT NULL,
+            temp_min REAL,
+            temp_max REAL,
+            temp_sum REAL NOT NULL,
+            humidity_min INTEGER,
+            humidity_max INTEGER,
+            humidity_sum REAL NOT NULL,
+            humidity_count INTEGER NOT NULL,
+            wind_min REAL,
+            wind_max REAL,
+            wind_sum REAL NOT NULL,
+            wind_count INTEGER NOT NULL,
+            PRIMARY KEY (city, bucket)
+        )
+    '''
+
+def history_aggregates(conn):
+    """v8: hourly and daily per-city aggregates that compacted history is folded into"""
+    for table in ('weather_history_hourly', 'weather_history_daily'):
+        conn.execute(aggregate_table_sql(table))
+        conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_bucket ON {table}(bucket)')
+
+HISTORY_VIEW = 'weather_history_all'
+
+HISTORY_STORED_COLUMNS = (
+    'id', 'city', 'country', 'temperature', 'condition', 'description', 'humidity',
+    'wind_speed', 'pressure', 'feels_like', 'visibility', 'uv_index', 'searched_at'
+)
+
+def create_history_view(conn, partitions=()):
+    """(Re)create weather_history_all as weather_history plus every partition"""
+    conn.execute(f'DROP VIEW IF EXISTS {HISTORY_VIEW}')
+    conn.execute(f'CREATE VIEW {HISTORY_VIEW} AS ' + ' UNION ALL '.join(
+        f"SELECT {', '.join(HISTORY_STORED_COLUMNS)} FROM {table}"
+        for table in ['weather_history'] + list(partitions)
+    ))
+
+def history_partitions(conn):
+    """v9: registry of sealed history partitions and the weather_history_all view
+    
+    The rollup triggers now recompute extremes over weather_history_all, so
+    the statistics keep covering rows once they are sealed into partitions.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS history_partitions (
+            name TEXT PRIMARY KEY,
+            range_start TIMESTAMP NOT NULL,
+            range_end TIMESTAMP NOT NULL,
+            row_count INTEGER NOT NULL,
+            archive_path TEXT,
+            sealed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    partitions = [row[0] for row in conn.execute(
+        "SELECT name FROM history_partitions WHERE archive_path IS NULL ORDER BY range_start DESC"
+    )]
+    create_history_view(conn, partitions)
+    
+    for name, body in rollup_triggers(HISTORY_VIEW).items():
+        conn.execute(f'DROP TRIGGER IF EXISTS {name}')
+        conn.execute(f'CREATE TRIGGER {name} {body}')
+
+def offline_lookup_index(conn):
+    """v10: case-insensitive city lookup of stored forecasts for the offline read path
+    
+    Forecasts are stored under the city as it was typed, so serving the
+    last-known forecast matches city = ? COLLATE NOCASE, day by day.
+    """
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_weather_forecast_city_nocase
+        ON weather_forecast(city COLLATE NOCASE, forecast_date)
+    ''')
+
+def drop_recent_history_index(conn):
+    """v11: drop idx_weather_history_recent from databases that were already past v5"""
+    conn.execute('DROP INDEX IF EXISTS idx_weather_history_recent')
+
+MIGRATIONS = [
+    create_tables,
+    add_viewer_columns,
+    unique_forecast_day,
+    query_indexes,
+    history_paging_index,
+    history_search_index,
+    history_rollups,
+    history_aggregates,
+    history_partitions,
+    offline_lookup_index,
+    drop_recent_history_index
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+def schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def migrate(conn):
+    """Apply every pending migration and return the versions applied
+    
+    The applied version is kept in PRAGMA user_version. Each migration runs
+    in one transaction with its version bump and is idempotent, so databases
+    created by older builds or by database_checker.py migrate cleanly.
+    History indexes and triggers left dropped by an interrupted bulk import
+    are restored afterwards, but not while that import is still running.
+    """
+    applied = []
+    for version in range(schema_version(conn) + 1, SCHEMA_VERSION + 1):
+        conn.execute('BEGIN')
+        try:
+            MIGRATIONS[version - 1](conn)
+            conn.execute(f'PRAGMA user_version = {version}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(version)
+        print(f"🔧 Applied schema migration {version} ({MIGRATIONS[version - 1].__name__})")
+    
+    if history_import_running(conn):
+        print("⏳ A history import is running; it restores its indexes when it finishes")
+    else:
+        restore_history_objects(conn)
+    return applied
+
+DEFERRED_OBJECTS_TABLE = 'history_deferred_objects'
+
+def import_lock_path(conn):
+    """Path of the sidecar file a bulk import keeps locked, or None for in-memory databases"""
+    path = conn.execute('PRAGMA database_list').fetchone()[2]
+    return f'{path}-import-lock' if path else None
+
+@contextmanager
+def history_import_lock(conn):
+    """Mark a bulk import as running for as long as the block lasts
+    
+    The import holds an exclusive SQLite lock on a sidecar file. The lock
+    is released by the OS if the process dies, so history_import_running()
+    can tell an import still in progress (in any process) from one that was
+    killed and left its deferred objects behind.
+    """
+    path = import_lock_path(conn)
+    if path is None:
+        yield
+        return
+    
+    lock = sqlite3.connect(path, timeout=0, isolation_level=None)
+    try:
+        try:
+            # Nothing is ever written to the lock file, so it needs no journal on disk
+            lock.execute('PRAGMA journal_mode=MEMORY')
+            lock.execute('BEGIN EXCLUSIVE')
+        except sqlite3.OperationalError:
+            raise sqlite3.OperationalError("Another history import is already running") from None
+        yield
+    finally:
+        lock.close()
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def history_import_running(conn):
+    """Whether some process currently holds history_import_lock() for this database"""
+    path = import_lock_path(conn)
+    if path is None or not os.path.exists(path):
+        return False
+    
+    probe = sqlite3.connect(path, timeout=0, isolation_level=None)
+    try:
+        probe.execute('PRAGMA journal_mode=MEMORY')
+        probe.execute('BEGIN EXCLUSIVE')
+    except sqlite3.OperationalError:
+        return True
+    finally:
+        probe.close()
+    
+    # Left behind by an import that was killed
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+    return False
+
+def defer_history_objects(conn):
+    """Drop weather_history's secondary indexes and triggers for a bulk load
+    
+    Their definitions are saved in history_deferred_objects in the same
+    transaction as the drops, so restore_history_objects() can put them back
+    even when the load is killed halfway. Call it inside history_import_lock()
+    so migrate() in other processes leaves them alone until the load ends.
+    Returns how many were dropped.
+    """
+    deferred = conn.execute('''
+        SELECT type, name, sql FROM sqlite_master
+        WHERE tbl_name = 'weather_history' AND type IN ('index', 'trigger') AND sql IS NOT NULL
+    ''').fetchall()
+    with conn:
+        conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS {DEFERRED_OBJECTS_TABLE} (
+                name TEXT PRIMARY KEY,
+                type TEXT NOT NULL,
+                sql TEXT NOT NULL
+            )
+        ''')
+        conn.executemany(
+            f'INSERT OR REPLACE INTO {DEFERRED_OBJECTS_TABLE} (type, name, sql) VALUES (?, ?, ?)', deferred
+        )
+        for object_type, name, _ in deferred:
+            conn.execute(f"DROP {object_type.upper()} IF EXISTS {name}")
+    return len(deferred)
+
+def restore_history_objects(conn):
+    """Recreate deferred indexes and triggers, then rebuild what the triggers maintain
+    
+    Does nothing unless defer_history_objects() left something to restore.
+    Returns how many objects were recreated.
+    """
+    schema = {row[0]: row[1] for row in conn.execute("SELECT name, type FROM sqlite_master")}
+    if DEFERRED_OBJECTS_TABLE not in schema:
+        return 0
+    deferred = conn.execute(f'SELECT name, sql FROM {DEFERRED_OBJECTS_TABLE}').fetchall()
+    if not deferred:
+        return 0
+    
+    print("🔧 Rebuilding history indexes, search index and statistics...")
+    with conn:
+        for name, sql in deferred:
+            if name not in schema:
+                conn.execute(sql)
+        if 'weather_history_fts' in schema:
+            conn.execute("INSERT INTO weather_history_fts (weather_history_fts) VALUES ('rebuild')")
+        if 'city_stats' in schema:
+            rebuild_rollups(conn)
+        conn.execute(f'DELETE FROM {DEFERRED_OBJECTS_TABLE}')
+    return len(deferred)
@@ -0,0 +1,40 @@
+import threading
+from concurrent.futures import Future
+
+class SingleFlight:
+    """Share one in-flight call between concurrent callers with the same key
+    
+    The first caller for a key runs the function; callers that arrive while
+    it is still running wait for and receive the same result (or exception).
+    """
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.shared = 0
+    
+    def do(self, key, func):
+        """Run func() once per key among concurrent callers and return its result"""
+        with self.lock:
+            future = self.calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self.calls[key] = future
+            else:
+                self.shared += 1
+        
+        if not leader:
+            return future.result()
+        
+        try:
+            result = func()
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self.lock:
+                del self.calls[key]
@@ -1,24 +1,73 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, font
-import sqlite3
 from datetime import datetime, timedelta
-import requests
+from concurrent.futures import ThreadPoolExecutor
+import argparse
 import json
 import random
+import time
+from weather_client import WeatherAPIError, get_weather_icon
+from forecast_view import ForecastViewModel
+from weather_cache import TTLCache, SQLiteCacheTier
+from weather_repository import WeatherRepository
+from weather_service import WeatherService
+from weather_retention import RetentionPolicy
+from history_partitions import PARTITION_PERIODS
 
 class WeatherForecastApp:
-    def __init__(self, root):
+    def __init__(self, root, started=None, demo=False, retention=None, partition_period=None,
+                 calls_per_minute=60, calls_per_day=None):
         self.root = root
         self.root.title("Weather Forecasting App")
         self.root.geometry("1400x1000")  # Increased window size
         self.root.configure(bg='#e3f2fd')
         
+        # Startup steps are timed and reported once the window is first idle
+        self.startup_started = started if started is not None else time.perf_counter()
+        self.startup_marks = []
+        self.mark_startup("window")
+        
         # OpenWeather API Configuration
         self.api_key = "   "  # Replace with your actual API key
         self.base_url = "http://api.openweathermap.org/data/2.5"
         
+        # Random sample data is only shown in demo mode; otherwise an unset key
+        # or a failed call falls back to the last weather stored for the city
+        self.demo = demo
+        
         # Initialize database
         self.init_database()
+        self.mark_startup("database")
+        
+        # Fetch/parse/persist service: pooled HTTP client with retry/backoff, the shared
+        # rate limiter and a response cache with separate TTLs (seconds) for current
+        # conditions and forecasts. Expired entries are still served for stale_ttl
+        # seconds while a refresh runs. History is only compacted or partitioned when
+        # asked for (a RetentionPolicy, a partition period). With live data, the 10
+        # most searched cities are prefetched in the background.
+        self.service = WeatherService(
+            self.api_key, self.base_url,
+            repository=self.repository,
+            cache=TTLCache(
+                max_entries=256,
+                stale_ttl=600,
+                sqlite_tier=SQLiteCacheTier('weather_forecast_real.db', max_age=3600 + 600)
+            ),
+            cache_ttls={'weather': 600, 'forecast': 3600},
+            pool_maxsize=10,
+            calls_per_minute=calls_per_minute,
+            calls_per_day=calls_per_day,
+            retention=retention,
+            partition_period=partition_period,
+            prefetch_top=10 if self.has_api_key() and not self.demo else 0
+        )
+        self.mark_startup("service")
+        
+        # Background workers for network calls so the Tk mainloop never blocks
+        self.executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="weather-fetch")
+        self.search_generation = 0
+        self.pending_futures = []
+        self.poll_interval_ms = 50
         
         # Current active tab
         self.active_tab = "Home"
@@ -27,40 +76,13 @@ class WeatherForecastApp:
         
         # Load initial data with sample forecast
         self.load_initial_data()
+        self.mark_startup("widgets")
+        self.root.after_idle(self.report_startup)
         
     def init_database(self):
         """Initialize SQLite database for historical data"""
-        self.conn = sqlite3.connect('weather_forecast_real.db')
-        self.cursor = self.conn.cursor()
-        
-        # Create weather_history table matching your SQL structure
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS weather_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                city TEXT NOT NULL,
-                temperature REAL NOT NULL,
-                condition TEXT NOT NULL,
-                humidity INTEGER,
-                wind_speed REAL,
-                searched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Create forecast table
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS weather_forecast (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                city TEXT NOT NULL,
-                day_name TEXT NOT NULL,
-                forecast_date DATE,
-                high_temp REAL NOT NULL,
-                low_temp REAL NOT NULL,
-                condition TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        self.conn.commit()
+        self.repository = WeatherRepository('weather_forecast_real.db')
+        self.repository.init_schema()
         print("✅ Database initialized successfully!")
         
     def create_widgets(self):
@@ -86,12 +108,18 @@ class WeatherForecastApp:
         title_label.pack(side='left')
         
         # API Status indicator
+        if self.demo:
+            status_text, status_color = "🔴 Demo Mode", '#ff5722'
+        elif not self.has_api_key():
+            status_text, status_color = "🟠 Offline", '#ff9800'
+        else:
+            status_text, status_color = "🟢 Live Data", '#4caf50'
         self.api_status = tk.Label(
             header_content,
-            text="🔴 Demo Mode" if self.api_key == "YOUR_API_KEY_HERE" else "🟢 Live Data",
+            text=status_text,
             font=("Arial", 12),  # Increased font size
             bg='white',
-            fg='#ff5722' if self.api_key == "YOUR_API_KEY_HERE" else '#4caf50'
+            fg=status_color
         )
         self.api_status.pack(side='right', padx=(0, 30))
         
@@ -121,10 +149,13 @@ class WeatherForecastApp:
         self.main_frame = tk.Frame(self.root, bg='#e3f2fd')
         self.main_frame.pack(fill='both', expand=True, padx=50, pady=25)
         
-        # Create content for different tabs
-        self.create_home_content()
-        self.create_search_content()
-        self.create_history_content()
+        # Tab content is built the first time each tab is shown
+        self.tab_builders = {
+            "Home": self.create_home_content,
+            "Search": self.create_search_content,
+            "History": self.create_history_content
+        }
+        self.tab_contents = {}
         
         # Show home content initially
         self.show_content("Home")
@@ -138,6 +169,7 @@ class WeatherForecastApp:
         
         # 7-Day Forecast Section (Always visible on home)
         self.create_forecast_section(self.home_content)
+        return self.home_content
         
     def create_search_content(self):
         """Create search tab content"""
@@ -204,6 +236,7 @@ class WeatherForecastApp:
         
         # Initially hidden
         self.search_weather_card.pack_forget()
+        return self.search_content
         
     def create_history_content(self):
         """Create history tab content - Only shows search history"""
@@ -223,6 +256,13 @@ class WeatherForecastApp:
         self.history_frame = tk.Frame(self.history_content, bg='#e3f2fd')
         self.history_frame.pack(fill='both', expand=True)
         
+        # Pooled history cards, re-rendered only when history_version changes
+        self.history_grid = None
+        self.history_empty_label = None
+        self.history_cards = []
+        self.history_version = None
+        return self.history_content
+        
     def create_current_weather_section(self, parent):
         """Create the current weather section"""
         # Current Weather Title
@@ -340,7 +380,7 @@ class WeatherForecastApp:
             card.pack_propagate(False)
             
             # Day name
-            day_label = tk.Label(card, text="Mon", font=("Arial", 16, "bold"), bg='white', fg='#333')
+            day_label = tk.Label(card, text="--", font=("Arial", 16, "bold"), bg='white', fg='#333')
             day_label.pack(pady=(20, 15))
             
             # Weather icon - Larger
@@ -348,15 +388,15 @@ class WeatherForecastApp:
             icon_label.pack(pady=8)
             
             # High temperature
-            high_label = tk.Label(card, text="25°C", font=("Arial", 18, "bold"), bg='white', fg='#333')
+            high_label = tk.Label(card, text="--°C", font=("Arial", 18, "bold"), bg='white', fg='#333')
             high_label.pack(pady=2)
             
             # Low temperature
-            low_label = tk.Label(card, text="18°C", font=("Arial", 16), bg='white', fg='#666')
+            low_label = tk.Label(card, text="--°C", font=("Arial", 16), bg='white', fg='#666')
             low_label.pack(pady=2)
             
             # Condition
-            condition_label = tk.Label(card, text="Sunny", font=("Arial", 12), bg='white', fg='#666')
+            condition_label = tk.Label(card, text="", font=("Arial", 12), bg='white', fg='#666')
             condition_label.pack(pady=(8, 20))
             
             self.forecast_cards.append({
@@ -367,21 +407,31 @@ class WeatherForecastApp:
                 'low': low_label,
                 'condition': condition_label
             })
+        
+        # What the cards show; forecast updates are diffed against it and
+        # repainted at most once per idle cycle
+        self.forecast_view = ForecastViewModel(len(self.forecast_cards))
+        self.pending_forecast = None
+        self.forecast_repaint_id = None
+    
+    def get_tab_content(self, tab):
+        """The content frame for a tab, built the first time it is needed"""
+        content = self.tab_contents.get(tab)
+        if content is None:
+            content = self.tab_contents[tab] = self.tab_builders[tab]()
+        return content
     
     def show_content(self, tab):
         """Show content for the selected tab"""
-        # Hide all content frames
-        self.home_content.pack_forget()
-        self.search_content.pack_forget()
-        self.history_content.pack_forget()
+        content = self.get_tab_content(tab)
+        
+        # Hide all content frames that have been built
+        for frame in self.tab_contents.values():
+            frame.pack_forget()
         
         # Show selected content
-        if tab == "Home":
-            self.home_content.pack(fill='both', expand=True)
-        elif tab == "Search":
-            self.search_content.pack(fill='both', expand=True)
-        elif tab == "History":
-            self.history_content.pack(fill='both', expand=True)
+        content.pack(fill='both', expand=True)
+        if tab == "History":
             # Refresh history when showing history tab
             self.create_history_cards()
     
@@ -408,159 +458,133 @@ class WeatherForecastApp:
                 'high': high,
                 'low': low,
                 'condition': condition,
-                'icon': icon
+                'icon': icon,
+                'is_mock': True
             })
         
         return forecast
     
+    def has_api_key(self):
+        """Whether an OpenWeather API key has been configured"""
+        key = self.api_key.strip()
+        return bool(key) and key != "YOUR_API_KEY_HERE"
+    
     def fetch_current_weather(self, city):
-        """Fetch current weather from OpenWeather API or generate mock data"""
-        if self.api_key == "YOUR_API_KEY_HERE":
+        """Fetch current weather from OpenWeather API, or the last stored weather when offline"""
+        if self.demo:
             return self.generate_mock_weather(city)
+        if not self.has_api_key():
+            return self.offline_weather(city)
         
         try:
-            url = f"{self.base_url}/weather"
-            params = {
-                'q': city,
-                'appid': self.api_key,
-                'units': 'metric'
-            }
-            
-            response = requests.get(url, params=params, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                return {
-                    'city': data['name'],
-                    'temperature': round(data['main']['temp'], 1),
-                    'condition': data['weather'][0]['main'],
-                    'description': data['weather'][0]['description'].title(),
-                    'humidity': data['main']['humidity'],
-                    'wind_speed': round(data['wind']['speed'] * 3.6, 1),
-                    'high': round(data['main']['temp_max'], 1),
-                    'low': round(data['main']['temp_min'], 1),
-                    'icon': data['weather'][0]['icon']
-                }
-            else:
-                raise Exception(f"API Error: {response.status_code}")
-                
-        except Exception as e:
-            print(f"API Error: {e}, using mock data")
-            return self.generate_mock_weather(city)
+            return self.service.fetch_current_weather(city)
+        except WeatherAPIError as e:
+            # An unknown city or a bad key is reported, not papered over with stored data
+            if not e.unavailable:
+                raise
+            print(f"API Error: {e}, using last stored weather")
+            return self.offline_weather(city)
     
     def fetch_forecast(self, city):
-        """Fetch 7-day forecast from OpenWeather API or generate mock data"""
-        if self.api_key == "YOUR_API_KEY_HERE":
+        """Fetch 7-day forecast from OpenWeather API, or the last stored forecast when offline"""
+        if self.demo:
             return self.generate_sample_forecast()
+        if not self.has_api_key():
+            return self.offline_forecast(city)
         
         try:
-            url = f"{self.base_url}/forecast"
-            params = {
-                'q': city,
-                'appid': self.api_key,
-                'units': 'metric'
-            }
-            
-            response = requests.get(url, params=params, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                forecast_list = []
-                
-                # Group by day and get daily high/low
-                daily_data = {}
-                for item in data['list']:
-                    date = datetime.fromtimestamp(item['dt']).date()
-                    day_name = date.strftime('%a')
-                    
-                    if date not in daily_data:
-                        daily_data[date] = {
-                            'day': day_name,
-                            'date': date,
-                            'temps': [],
-                            'conditions': []
-                        }
-                    
-                    daily_data[date]['temps'].append(item['main']['temp'])
-                    daily_data[date]['conditions'].append(item['weather'][0]['main'])
-                
-                # Convert to forecast format
-                for date, day_data in list(daily_data.items())[:7]:
-                    condition = max(set(day_data['conditions']), key=day_data['conditions'].count)
-                    forecast_list.append({
-                        'day': day_data['day'],
-                        'date': date,
-                        'high': round(max(day_data['temps']), 1),
-                        'low': round(min(day_data['temps']), 1),
-                        'condition': condition,
-                        'icon': self.get_weather_icon(condition)
-                    })
-                
-                return forecast_list
-            else:
-                raise Exception(f"API Error: {response.status_code}")
-                
-        except Exception as e:
-            print(f"Forecast API Error: {e}, using sample data")
-            return self.generate_sample_forecast()
+            return self.service.fetch_forecast(city)
+        except WeatherAPIError as e:
+            if not e.unavailable:
+                raise
+            print(f"Forecast API Error: {e}, using last stored forecast")
+            return self.offline_forecast(city)
+    
+    def offline_weather(self, city):
+        """Last-known weather for a city from the database"""
+        data = self.service.last_known_weather(city)
+        if data is None:
+            raise WeatherAPIError(f"Live data is unavailable and no weather is stored for {city}")
+        print(f"📦 Showing stored weather for {data['city']} from {data['as_of']}")
+        return data
+    
+    def offline_forecast(self, city):
+        """Last-known forecast for a city from the database"""
+        forecast_data = self.service.last_known_forecast(city)
+        if not forecast_data:
+            raise WeatherAPIError(f"Live data is unavailable and no current forecast is stored for {city}")
+        return forecast_data
     
     def get_weather_icon(self, condition):
         """Get weather icon based on condition"""
-        condition = condition.lower()
-        
-        if 'clear' in condition or 'sun' in condition:
-            return "☀️"
-        elif 'cloud' in condition:
-            return "☁️"
-        elif 'rain' in condition or 'drizzle' in condition:
-            return "🌧️"
-        elif 'snow' in condition:
-            return "❄️"
-        elif 'thunder' in condition:
-            return "⛈️"
-        elif 'mist' in condition or 'fog' in condition:
-            return "🌫️"
-        else:
-            return "🌤️"
+        return get_weather_icon(condition)
     
     def search_weather(self, event=None):
-        """Search for weather data"""
+        """Search for weather data without blocking the UI"""
         city = self.search_entry.get().strip()
         if not city or city == "Search for a city...":
             messagebox.showwarning("Input Required", "Please enter a city name")
             return
         
+        # Supersede any older in-flight search; its results will be ignored
+        self.search_generation += 1
+        generation = self.search_generation
+        for future in self.pending_futures:
+            future.cancel()
+        
+        # Show loading state
+        self.city_label.config(text="Loading...")
+        
+        # Fetch current weather and forecast concurrently
+        weather_future = self.executor.submit(self.fetch_current_weather, city)
+        forecast_future = self.executor.submit(self.fetch_forecast, city)
+        self.pending_futures = [weather_future, forecast_future]
+        
+        self.root.after(
+            self.poll_interval_ms, self.poll_search_results,
+            generation, city, weather_future, forecast_future
+        )
+    
+    def poll_search_results(self, generation, city, weather_future, forecast_future):
+        """Hand finished worker results back to the Tk thread"""
+        if generation != self.search_generation:
+            return  # A newer search has been started
+        
+        if not (weather_future.done() and forecast_future.done()):
+            self.root.after(
+                self.poll_interval_ms, self.poll_search_results,
+                generation, city, weather_future, forecast_future
+            )
+            return
+        
+        self.pending_futures = []
+        
         try:
-            # Show loading state
-            self.city_label.config(text="Loading...")
-            self.root.update()
-            
-            # Fetch current weather
-            weather_data = self.fetch_current_weather(city)
-            
-            # Fetch forecast
-            forecast_data = self.fetch_forecast(city)
-            
-            # Update display
-            self.update_current_weather(weather_data)
-            self.update_forecast(forecast_data)
-            
-            # Save to database
-            self.save_weather_data(weather_data)
-            self.save_forecast_data(city, forecast_data)
-            
-            # Switch to home tab to show results
-            self.switch_tab("Home")
-            
-            # Clear search entry
-            self.search_entry.delete(0, tk.END)
-            self.search_entry.insert(0, "Search for a city...")
-            self.search_entry.config(fg='#666')
-            
+            weather_data = weather_future.result()
+            forecast_data = forecast_future.result()
+            self.show_search_results(city, weather_data, forecast_data)
         except Exception as e:
             messagebox.showerror("Error", f"Failed to fetch weather data:\n{str(e)}")
             self.city_label.config(text="Error loading data")
     
+    def show_search_results(self, city, weather_data, forecast_data):
+        """Display and store the results of a completed search"""
+        # Update display
+        self.update_current_weather(weather_data)
+        self.update_forecast(forecast_data)
+        
+        # Save to database
+        self.save_weather_data(weather_data)
+        self.save_forecast_data(city, forecast_data)
+        
+        # Switch to home tab to show results
+        self.switch_tab("Home")
+        
+        # Clear search entry
+        self.search_entry.delete(0, tk.END)
+        self.search_entry.insert(0, "Search for a city...")
+        self.search_entry.config(fg='#666')
+    
     def generate_mock_weather(self, city):
         """Generate mock weather data"""
         conditions = ["Clear", "Clouds", "Rain", "Snow", "Thunderstorm"]
@@ -576,7 +600,8 @@ class WeatherForecastApp:
             'wind_speed': round(random.uniform(5, 25), 1),
             'high': temp + random.randint(2, 8),
             'low': temp - random.randint(2, 8),
-            'icon': '01d'
+            'icon': '01d',
+            'is_mock': True
         }
     
     def update_current_weather(self, data):
@@ -585,158 +610,210 @@ class WeatherForecastApp:
         self.temp_label.config(text=f"{data['temperature']}°C")
         self.condition_label.config(text=data['description'])
         
-        self.humidity_label.config(text=f"Humidity: {data['humidity']}%")
-        self.wind_label.config(text=f"Wind: {data['wind_speed']} km/h")
-        self.high_label.config(text=f"High: {data['high']}°C")
-        self.low_label.config(text=f"Low: {data['low']}°C")
+        self.humidity_label.config(text=f"Humidity: {self.format_reading(data['humidity'])}%")
+        self.wind_label.config(text=f"Wind: {self.format_reading(data['wind_speed'])} km/h")
+        self.high_label.config(text=f"High: {self.format_reading(data['high'])}°C")
+        self.low_label.config(text=f"Low: {self.format_reading(data['low'])}°C")
+        
+        # Stored data says how old it is instead of today's date
+        if data.get('is_stale'):
+            self.date_label.config(
+                text=f"Offline · last updated {self.format_history_date(data['as_of'])}", fg='#ff5722'
+            )
+        else:
+            self.date_label.config(text=datetime.now().strftime("%A, %B %d"), fg='#666')
         
         # Update weather icon
         icon = self.get_weather_icon(data['condition'])
         self.weather_icon.config(text=icon)
     
+    def format_reading(self, value):
+        """A reading for display, '--' when it is unknown"""
+        return '--' if value is None else value
+    
     def update_forecast(self, forecast_data):
-        """Update 7-day forecast display"""
-        for i, (card, data) in enumerate(zip(self.forecast_cards, forecast_data)):
-            card['day'].config(text=data['day'])
-            card['high'].config(text=f"{data['high']}°C")
-            card['low'].config(text=f"{data['low']}°C")
-            card['condition'].config(text=data['condition'])
-            
-            icon = data.get('icon', self.get_weather_icon(data['condition']))
-            card['icon'].config(text=icon)
+        """Update 7-day forecast display
+        
+        Updates arriving before the next idle cycle replace each other, so a
+        burst of searches costs one repaint of the latest forecast.
+        """
+        self.pending_forecast = forecast_data
+        if self.forecast_repaint_id is None:
+            self.forecast_repaint_id = self.root.after_idle(self.repaint_forecast)
+    
+    def repaint_forecast(self):
+        """Apply the latest queued forecast, touching only labels whose text changed"""
+        self.forecast_repaint_id = None
+        forecast_data, self.pending_forecast = self.pending_forecast, None
+        if forecast_data is None:
+            return
+        
+        for index, field, text in self.forecast_view.diff(forecast_data):
+            self.forecast_cards[index][field].config(text=text)
     
     def save_weather_data(self, data):
         """Save weather data to database"""
+        if data.get('is_stale'):
+            return  # Already stored
+        if data.get('is_mock'):
+            print(f"⚠️ Not saving mock weather data for {data['city']}")
+            return
+        
         try:
-            self.cursor.execute('''
-                INSERT INTO weather_history 
-                (city, temperature, condition, humidity, wind_speed)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (
-                data['city'], data['temperature'], data['condition'],
-                data['humidity'], data['wind_speed']
-            ))
-            self.conn.commit()
-            print(f"✅ Saved {data['city']} weather data to database")
+            self.service.save_weather(data)
+            print(f"📝 Queued {data['city']} weather data for saving")
         except Exception as e:
             print(f"❌ Error saving weather data: {e}")
     
     def save_forecast_data(self, city, forecast_data):
         """Save forecast data to database"""
+        if any(day.get('is_stale') for day in forecast_data):
+            return  # Already stored
+        if any(day.get('is_mock') for day in forecast_data):
+            print(f"⚠️ Not saving mock forecast data for {city}")
+            return
+        
         try:
-            # Clear old forecast for this city
-            self.cursor.execute('DELETE FROM weather_forecast WHERE city = ?', (city,))
-            
-            # Insert new forecast
-            for data in forecast_data:
-                self.cursor.execute('''
-                    INSERT INTO weather_forecast 
-                    (city, day_name, forecast_date, high_temp, low_temp, condition)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (
-                    city, data['day'], data['date'], data['high'], data['low'], data['condition']
-                ))
-            
-            self.conn.commit()
-            print(f"✅ Saved {city} forecast data to database")
+            # Replace old forecast for this city
+            self.service.save_forecast(city, forecast_data)
+            print(f"📝 Queued {city} forecast data for saving")
         except Exception as e:
             print(f"❌ Error saving forecast data: {e}")
     
     def create_history_cards(self):
-        """Create history cards from database - Only shown on History tab"""
-        # Clear existing cards
-        for widget in self.history_frame.winfo_children():
-            widget.destroy()
+        """Show the latest searches on the History tab
         
+        Card widgets are created once and kept in self.history_cards; a render
+        only updates the labels whose row changed. When the history version
+        (newest id, row count) is the same as last time nothing is touched.
+        """
         try:
-            self.cursor.execute('''
-                SELECT city, temperature, condition, searched_at
-                FROM weather_history
-                ORDER BY searched_at DESC
-                LIMIT 12
-            ''')
-            history_data = self.cursor.fetchall()
-        except:
+            self.service.flush()
+            version = self.repository.history_version()
+            if version == self.history_version:
+                return
+            history_data = self.repository.recent_history(limit=12)
+        except Exception as e:
+            print(f"❌ Error loading history: {e}")
+            version = None
             history_data = []
+        self.history_version = version
         
         if not history_data:
-            no_data_label = tk.Label(
-                self.history_frame,
-                text="No search history yet. Search for a city to get started!",
-                font=("Arial", 18),
-                bg='#e3f2fd',
-                fg='#666'
-            )
-            no_data_label.pack(pady=50)
+            if self.history_grid is not None:
+                self.history_grid.pack_forget()
+            if self.history_empty_label is None:
+                self.history_empty_label = tk.Label(
+                    self.history_frame,
+                    text="No search history yet. Search for a city to get started!",
+                    font=("Arial", 18),
+                    bg='#e3f2fd',
+                    fg='#666'
+                )
+            self.history_empty_label.pack(pady=50)
             return
         
-        # Create a grid layout for history cards
-        history_grid = tk.Frame(self.history_frame, bg='#e3f2fd')
-        history_grid.pack(fill='both', expand=True, padx=20, pady=20)
+        if self.history_empty_label is not None:
+            self.history_empty_label.pack_forget()
+        if self.history_grid is None:
+            # Cards are laid out in a 3x4 grid
+            self.history_grid = tk.Frame(self.history_frame, bg='#e3f2fd')
+            for i in range(3):
+                self.history_grid.columnconfigure(i, weight=1)
+        self.history_grid.pack(fill='both', expand=True, padx=20, pady=20)
+        
+        for i, record in enumerate(history_data):
+            if i == len(self.history_cards):
+                self.history_cards.append(self.create_history_card(i))
+            self.update_history_card(self.history_cards[i], record)
+        
+        for card in self.history_cards[len(history_data):]:
+            card['frame'].grid_remove()
+            card['record'] = None
+    
+    def create_history_card(self, index):
+        """Build one empty history card at its grid position; returns its widgets"""
+        frame = tk.Frame(self.history_grid, bg='white', relief='solid', bd=2, width=220, height=140)  # Larger cards
+        frame.grid(row=index // 3, column=index % 3, padx=15, pady=15, sticky='nsew')
+        frame.pack_propagate(False)
+        
+        content = tk.Frame(frame, bg='white')
+        content.pack(expand=True, fill='both', padx=20, pady=20)
+        
+        city_label = tk.Label(content, font=("Arial", 16, "bold"), bg='white', fg='#333')
+        city_label.pack(anchor='w')
+        
+        condition_label = tk.Label(content, font=("Arial", 12), bg='white', fg='#666')
+        condition_label.pack(anchor='w')
+        
+        date_label = tk.Label(content, font=("Arial", 10), bg='white', fg='#999')
+        date_label.pack(anchor='w')
+        
+        # Bottom frame for icon and temperature
+        bottom_frame = tk.Frame(content, bg='white')
+        bottom_frame.pack(side='bottom', fill='x', pady=(15, 0))
+        
+        icon_label = tk.Label(bottom_frame, font=("Arial", 20), bg='white')
+        icon_label.pack(side='left')
+        
+        temp_label = tk.Label(bottom_frame, font=("Arial", 18, "bold"), bg='white', fg='#333')
+        temp_label.pack(side='right')
+        
+        card = {
+            'frame': frame,
+            'city': city_label,
+            'condition': condition_label,
+            'date': date_label,
+            'icon': icon_label,
+            'temp': temp_label,
+            'record': None
+        }
         
-        # Display cards in a 3x4 grid
-        for i, (city, temp, condition, date) in enumerate(history_data):
-            row = i // 3
-            col = i % 3
-            
-            card = tk.Frame(history_grid, bg='white', relief='solid', bd=2, width=220, height=140)  # Larger cards
-            card.grid(row=row, column=col, padx=15, pady=15, sticky='nsew')
-            card.pack_propagate(False)
-            
-            content = tk.Frame(card, bg='white')
-            content.pack(expand=True, fill='both', padx=20, pady=20)
-            
-            # City name
-            city_label = tk.Label(content, text=city, font=("Arial", 16, "bold"), bg='white', fg='#333')
-            city_label.pack(anchor='w')
-            
-            # Condition
-            condition_label = tk.Label(content, text=condition, font=("Arial", 12), bg='white', fg='#666')
-            condition_label.pack(anchor='w')
-            
-            # Date
-            try:
-                date_obj = datetime.fromisoformat(date.replace('Z', '+00:00') if 'Z' in date else date)
-                date_str = date_obj.strftime("%m/%d %H:%M")
-            except:
-                date_str = "Recent"
-            
-            date_label = tk.Label(content, text=date_str, font=("Arial", 10), bg='white', fg='#999')
-            date_label.pack(anchor='w')
-            
-            # Bottom frame for icon and temperature
-            bottom_frame = tk.Frame(content, bg='white')
-            bottom_frame.pack(side='bottom', fill='x', pady=(15, 0))
-            
-            # Weather icon
-            icon = self.get_weather_icon(condition)
-            icon_label = tk.Label(bottom_frame, text=icon, font=("Arial", 20), bg='white')
-            icon_label.pack(side='left')
-            
-            # Temperature
-            temp_label = tk.Label(bottom_frame, text=f"{temp}°C", font=("Arial", 18, "bold"), bg='white', fg='#333')
-            temp_label.pack(side='right')
-            
-            # Make card clickable
-            def on_click(city=city):
-                self.search_entry.delete(0, tk.END)
-                self.search_entry.insert(0, city)
-                self.search_weather()
-            
-            card.bind("<Button-1>", lambda e, city=city: on_click(city))
-            for child in self.get_all_children(card):
-                child.bind("<Button-1>", lambda e, city=city: on_click(city))
+        # Make the whole card clickable; the handler reads whichever city it shows
+        for widget in (frame, content, city_label, condition_label, date_label, bottom_frame, icon_label, temp_label):
+            widget.bind("<Button-1>", lambda e, card=card: self.on_history_card_click(card))
+        return card
+    
+    def update_history_card(self, card, record):
+        """Point a pooled card at a history row, reconfiguring only what changed"""
+        previous = card['record'] or (None, None, None, None)
+        if record == previous:
+            return
         
-        # Configure grid weights for responsive layout
-        for i in range(3):
-            history_grid.columnconfigure(i, weight=1)
+        city, temp, condition, date = record
+        if city != previous[0]:
+            card['city'].config(text=city)
+        if condition != previous[2]:
+            card['condition'].config(text=condition)
+            card['icon'].config(text=self.get_weather_icon(condition))
+        if date != previous[3]:
+            card['date'].config(text=self.format_history_date(date))
+        if temp != previous[1]:
+            card['temp'].config(text=f"{temp}°C")
+        
+        if card['record'] is None:
+            card['frame'].grid()
+        card['record'] = record
     
-    def get_all_children(self, widget):
-        """Get all child widgets recursively"""
-        children = [widget]
-        for child in widget.winfo_children():
-            children.extend(self.get_all_children(child))
-        return children
+    def format_history_date(self, date):
+        """'MM/DD HH:MM' for a stored timestamp"""
+        # SQLite's CURRENT_TIMESTAMP format can be sliced without parsing
+        if date and len(date) >= 16 and date[4] == '-' and date[10] in ' T':
+            return f"{date[5:7]}/{date[8:10]} {date[11:16]}"
+        try:
+            date_obj = datetime.fromisoformat(date.replace('Z', '+00:00') if 'Z' in date else date)
+            return date_obj.strftime("%m/%d %H:%M")
+        except:
+            return "Recent"
+    
+    def on_history_card_click(self, card):
+        """Search again for the city shown on a history card"""
+        if card['record'] is None:
+            return
+        self.get_tab_content("Search")
+        self.search_entry.delete(0, tk.END)
+        self.search_entry.insert(0, card['record'][0])
+        self.search_weather()
     
     def switch_tab(self, tab):
         """Switch between navigation tabs"""
@@ -763,6 +840,34 @@ class WeatherForecastApp:
             self.search_entry.config(fg='#666')
     
     def load_initial_data(self):
+        """Show the last city searched from the database, or sample data in demo mode"""
+        if self.demo:
+            self.load_sample_data()
+            return
+        
+        try:
+            weather_data = self.service.last_known_weather()
+            forecast_data = self.service.last_known_forecast(weather_data['city']) if weather_data else []
+        except Exception as e:
+            print(f"❌ Error loading stored weather: {e}")
+            weather_data, forecast_data = None, []
+        
+        if weather_data is None:
+            weather_data = {
+                'city': 'No weather yet',
+                'temperature': '--',
+                'condition': '',
+                'description': 'Search for a city to get started',
+                'humidity': None,
+                'wind_speed': None,
+                'high': None,
+                'low': None
+            }
+        self.update_current_weather(weather_data)
+        if forecast_data:
+            self.update_forecast(forecast_data)
+    
+    def load_sample_data(self):
         """Load initial display with sample data"""
         # Show sample current weather for New York
         sample_weather = {
@@ -781,18 +886,53 @@ class WeatherForecastApp:
         sample_forecast = self.generate_sample_forecast()
         self.update_forecast(sample_forecast)
     
+    def mark_startup(self, step):
+        """Record the end of a startup step"""
+        self.startup_marks.append((step, time.perf_counter()))
+    
+    def report_startup(self):
+        """Print how long each startup step took, up to the first idle cycle"""
+        self.mark_startup("first paint")
+        steps = []
+        previous = self.startup_started
+        for step, at in self.startup_marks:
+            steps.append(f"{step} {(at - previous) * 1000:.0f}ms")
+            previous = at
+        print(f"⏱️ Window ready in {(previous - self.startup_started) * 1000:.0f}ms ({', '.join(steps)})")
+    
     def __del__(self):
         """Close database connection"""
-        if hasattr(self, 'conn'):
-            self.conn.close()
+        if hasattr(self, 'executor'):
+            self.executor.shutdown(wait=False)
+        if hasattr(self, 'service'):
+            self.service.close()
 
 def main():
+    parser = argparse.ArgumentParser(description="Weather Forecasting App")
+    parser.add_argument('--demo', action='store_true', help="show random sample data; nothing is saved")
+    parser.add_argument('--raw-days', type=int,
+                        help="fold searches older than this many days into hourly/daily aggregates in the background")
+    parser.add_argument('--partition-period', choices=PARTITION_PERIODS,
+                        help="seal each past period of searches into its own partition in the background")
+    parser.add_argument('--calls-per-minute', type=int, default=60, help="API calls allowed per minute")
+    parser.add_argument('--calls-per-day', type=int,
+                        help="API calls allowed per day, if your plan has a daily limit (default: none)")
+    args = parser.parse_args()
+    retention = RetentionPolicy(raw_days=args.raw_days, hourly_days=365) if args.raw_days else None
+    
     print("🌤️ Starting Weather Forecasting App...")
     print("📊 SQLite Database Storage")
-    print("🎯 Sample Data Mode (Configure API key for live data)")
+    if args.demo:
+        print("🎯 Demo Mode (random sample data, nothing is saved)")
+    else:
+        print("📦 Offline-first: stored weather is shown when live data is unavailable")
     
+    started = time.perf_counter()
     root = tk.Tk()
-    app = WeatherForecastApp(root)
+    app = WeatherForecastApp(
+        root, started, demo=args.demo, retention=retention, partition_period=args.partition_period,
+        calls_per_minute=args.calls_per_minute, calls_per_day=args.calls_per_day
+    )
     
     print("✅ App started successfully!")
     print("💡 7-Day forecast prominently visible on home page")
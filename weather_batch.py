@@ -0,0 +1,88 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from weather_service import WeatherService
+
+def normalize_city(name):
+    """Normalise a city name so that ' new  york' and 'New York' match"""
+    return ' '.join(name.split()).casefold()
+
+class BatchWeatherFetcher:
+    def __init__(self, service, max_workers=8):
+        self.service = service
+        self.max_workers = max_workers
+    
+    def fetch_many(self, cities, save=True):
+        """Fetch current weather and forecast for many cities
+        
+        Names that normalise to the same city are fetched once. Returns a
+        dict mapping each requested name to a result dict with 'weather',
+        'forecast' and 'error' keys. Successful results are written to the
+        database in a single transaction.
+        """
+        unique = {}
+        for city in cities:
+            key = normalize_city(city)
+            if key and key not in unique:
+                unique[key] = ' '.join(city.split())
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="weather-batch") as pool:
+            fetched = dict(zip(unique, pool.map(self.fetch_city, unique.values())))
+        
+        if save:
+            self.save_results([fetched[key] for key in unique if fetched[key]['error'] is None])
+        
+        return {city: fetched[normalize_city(city)] for city in cities if normalize_city(city) in fetched}
+    
+    def fetch_city(self, city):
+        """Fetch and parse both endpoints for one city; errors are captured, never mocked"""
+        try:
+            return {
+                'city': city,
+                'weather': self.service.fetch_current_weather(city),
+                'forecast': self.service.fetch_forecast(city),
+                'error': None
+            }
+        except Exception as e:
+            return {'city': city, 'weather': None, 'forecast': None, 'error': str(e)}
+    
+    def save_results(self, results):
+        """Write a batch of results to weather_history and weather_forecast in one transaction"""
+        if not results:
+            return
+        
+        self.service.repository.save_batch(
+            [r['weather'] for r in results],
+            [(r['city'], r['forecast']) for r in results]
+        )
+        print(f"✅ Saved {len(results)} cities to database")
+
+def fetch_many(cities, api_key=None, max_workers=8, save=True, service=None):
+    """Convenience wrapper: fetch many cities with a (new) WeatherService"""
+    own_service = service is None
+    if own_service:
+        service = WeatherService(api_key, pool_maxsize=max_workers)
+    try:
+        return BatchWeatherFetcher(service, max_workers=max_workers).fetch_many(cities, save=save)
+    finally:
+        if own_service:
+            service.close()
+
+def main():
+    cities = sys.argv[1:]
+    if not cities:
+        print("Usage: python weather_batch.py CITY [CITY ...]")
+        return
+    
+    print(f"🌍 Fetching weather for {len(cities)} cities...")
+    results = fetch_many(cities)
+    
+    for city, result in results.items():
+        if result['error']:
+            print(f"❌ {city}: {result['error']}")
+        else:
+            weather = result['weather']
+            print(f"✅ {city}: {weather['temperature']}°C, {weather['description']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from db_manager import get_manager
+
+class SQLiteCacheTier:
+    """Persistent second cache tier stored in the weather database
+    
+    Every write also deletes entries stored more than max_age seconds ago
+    (set it to the longest ttl + stale_ttl in use) and keeps at most
+    max_entries rows, newest first, so raw payloads don't pile up.
+    """
+    
+    def __init__(self, db_path='weather_forecast_real.db', max_age=86400, max_entries=1024):
+        self.db = get_manager(db_path)
+        self.max_age = max_age
+        self.max_entries = max_entries
+        
+        with self.db.writer() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS api_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL,
+                    stored_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_api_cache_stored_at ON api_cache(stored_at)')
+            conn.commit()
+    
+    def get(self, key):
+        """Return (value, stored_at) for a key, or None"""
+        rows = self.db.read('SELECT payload, stored_at FROM api_cache WHERE cache_key = ?', (key,))
+        if not rows:
+            return None
+        return json.loads(rows[0][0]), rows[0][1]
+    
+    def set(self, key, value, stored_at):
+        """Store a JSON-serialisable value"""
+        with self.db.writer() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO api_cache (cache_key, payload, stored_at) VALUES (?, ?, ?)',
+                (key, json.dumps(value), stored_at)
+            )
+            self.prune(conn, stored_at)
+            conn.commit()
+    
+    def prune(self, conn, now):
+        if self.max_age is not None:
+            conn.execute('DELETE FROM api_cache WHERE stored_at < ?', (now - self.max_age,))
+        if self.max_entries is not None:
+            conn.execute('''
+                DELETE FROM api_cache WHERE stored_at < (
+                    SELECT stored_at FROM api_cache ORDER BY stored_at DESC LIMIT 1 OFFSET ?
+                )
+            ''', (self.max_entries - 1,))
+    
+    def close(self):
+        self.db.close()
+
+class TTLCache:
+    """In-memory LRU cache with per-entry TTL and stale-while-revalidate"""
+    
+    def __init__(self, max_entries=256, default_ttl=600, stale_ttl=600, sqlite_tier=None):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.stale_ttl = stale_ttl
+        self.sqlite_tier = sqlite_tier
+        
+        # key -> (value, stored_at, ttl), ordered from least to most recently used
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.refreshing = set()
+        
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.refreshes = 0
+    
+    @staticmethod
+    def make_key(*parts):
+        """Build a normalised string key, e.g. make_key('London', 'metric', 'weather')"""
+        return '|'.join(str(part).strip().lower() for part in parts)
+    
+    def get_or_fetch(self, key, fetch_func, ttl=None, stale_ttl=None):
+        """Return a cached value, fetching it on a miss
+        
+        Fresh entries are returned directly. Entries that expired less than
+        stale_ttl seconds ago are returned immediately while fetch_func runs
+        in a background thread to refresh them.
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        stale_ttl = self.stale_ttl if stale_ttl is None else stale_ttl
+        now = time.time()
+        
+        entry = self._lookup(key, ttl)
+        if entry is not None:
+            value, stored_at, entry_ttl = entry
+            age = now - stored_at
+            if age < entry_ttl:
+                with self.lock:
+                    self.hits += 1
+                return value
+            if age < entry_ttl + stale_ttl:
+                with self.lock:
+                    self.stale_hits += 1
+                self._refresh_in_background(key, fetch_func, ttl)
+                return value
+        
+        with self.lock:
+            self.misses += 1
+        value = fetch_func()
+        self.set(key, value, ttl)
+        return value
+    
+    def set(self, key, value, ttl=None):
+        """Store a value in memory (and in the SQLite tier if configured)"""
+        ttl = self.default_ttl if ttl is None else ttl
+        stored_at = time.time()
+        self._store(key, value, stored_at, ttl)
+        
+        if self.sqlite_tier is not None:
+            try:
+                self.sqlite_tier.set(key, value, stored_at)
+            except sqlite3.Error as e:
+                print(f"⚠️ Cache write failed: {e}")
+    
+    def invalidate(self, key):
+        """Drop a key from the in-memory tier"""
+        with self.lock:
+            self.entries.pop(key, None)
+    
+    def stats(self):
+        """Return hit/miss counters"""
+        with self.lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                'size': len(self.entries),
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'refreshes': self.refreshes,
+                'hit_rate': (self.hits + self.stale_hits) / lookups if lookups else 0.0
+            }
+    
+    def _lookup(self, key, ttl):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                return entry
+        
+        if self.sqlite_tier is None:
+            return None
+        
+        try:
+            stored = self.sqlite_tier.get(key)
+        except sqlite3.Error as e:
+            print(f"⚠️ Cache read failed: {e}")
+            return None
+        if stored is None:
+            return None
+        
+        value, stored_at = stored
+        self._store(key, value, stored_at, ttl)
+        return value, stored_at, ttl
+    
+    def _store(self, key, value, stored_at, ttl):
+        with self.lock:
+            self.entries[key] = (value, stored_at, ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+    
+    def _refresh_in_background(self, key, fetch_func, ttl):
+        with self.lock:
+            if key in self.refreshing:
+                return
+            self.refreshing.add(key)
+            self.refreshes += 1
+        
+        def refresh():
+            try:
+                self.set(key, fetch_func(), ttl)
+            except Exception as e:
+                print(f"⚠️ Background refresh failed for {key}: {e}")
+            finally:
+                with self.lock:
+                    self.refreshing.discard(key)
+        
+        threading.Thread(target=refresh, daemon=True).start()
@@ -0,0 +1,223 @@
+import argparse
+import os
+import sys
+import time
+
+from weather_cache import TTLCache
+from weather_repository import WeatherRepository
+from weather_service import WeatherService, DEFAULT_BASE_URL
+from weather_batch import BatchWeatherFetcher
+from weather_export import EXPORT_COLUMNS, EXPORT_FORMATS, export_table
+from weather_import import HistoryImporter
+from weather_retention import HistoryCompactor, RetentionPolicy
+from history_partitions import PARTITION_PERIODS, HistoryPartitions
+
+def print_weather(data):
+    print(f"🌤️ {data['city']}: {data['temperature']}°C, {data['description']}")
+    print(f"   Humidity: {data['humidity']}%  Wind: {data['wind_speed']} km/h  "
+          f"High: {data['high']}°C  Low: {data['low']}°C")
+
+def print_forecast(forecast_data):
+    for day in forecast_data:
+        print(f"   {day['day']} {day['date']}  {day['icon']} {day['high']:>5}°C / {day['low']:>5}°C  "
+              f"{day['condition']:<12} 💧{day['precipitation_chance']:>3}%  "
+              f"Humidity: {day['humidity']}%  Wind: {day['wind_speed']} km/h")
+
+def cmd_current(service, args):
+    print_weather(service.fetch_current_weather(args.city))
+
+def cmd_forecast(service, args):
+    print(f"📅 Forecast for {args.city}:")
+    print_forecast(service.fetch_forecast(args.city))
+
+def cmd_search(service, args):
+    weather_data, forecast_data = service.search(args.city, save=not args.no_save)
+    print_weather(weather_data)
+    print_forecast(forecast_data)
+
+def cmd_batch(service, args):
+    cities = list(args.cities)
+    if args.file:
+        with open(args.file, encoding='utf-8') as f:
+            cities.extend(line.strip() for line in f if line.strip())
+    
+    results = BatchWeatherFetcher(service, max_workers=args.workers).fetch_many(cities, save=not args.no_save)
+    for city, result in results.items():
+        if result['error']:
+            print(f"❌ {city}: {result['error']}")
+        else:
+            print(f"✅ {city}: {result['weather']['temperature']}°C, {result['weather']['description']}")
+
+def cmd_history(service, args):
+    if args.resolution != 'raw':
+        rows = service.repository.history_aggregates(args.resolution, args.city, args.limit)
+        for city, bucket, samples, temp_min, temp_max, temp_mean, *_ in rows:
+            print(f"   {bucket}  {city:<20} {temp_min:>5}..{temp_max:<5}°C  mean {temp_mean:.1f}°C  ({samples} searches)")
+        return
+    
+    if args.since or args.until:
+        rows = service.repository.history_between(args.since, args.until, args.city, args.limit)
+        for _, city, _, temp, condition, *_, searched_at in rows:
+            print(f"   {searched_at}  {city:<20} {temp:>5}°C  {condition}")
+        return
+    
+    for city, temp, condition, searched_at in service.repository.recent_history(args.limit):
+        print(f"   {searched_at}  {city:<20} {temp:>5}°C  {condition}")
+
+def cmd_export(service, args):
+    os.makedirs(args.out, exist_ok=True)
+    tables = list(EXPORT_COLUMNS) if args.table == 'all' else [f"weather_{args.table}"]
+    
+    for table in tables:
+        path = os.path.join(args.out, f"{table}.{args.format}")
+        start = time.perf_counter()
+        
+        def progress(done, total):
+            print(f"\r   {table}: {done:,} / {total:,} rows", end='', flush=True)
+        
+        rows = export_table(service.repository, table, path, args.format, args.chunk_size, progress)
+        elapsed = time.perf_counter() - start
+        print(f"\r📤 {path}: {rows:,} rows in {elapsed:.1f}s".ljust(60))
+
+def cmd_import(service, args):
+    importer = HistoryImporter(service.repository, batch_size=args.batch_size, defer_indexes=not args.keep_indexes)
+    
+    def progress(imported, rejected):
+        print(f"\r   {imported:,} rows imported, {rejected:,} rejected", end='', flush=True)
+    
+    summary = importer.import_file(args.file, args.format, progress)
+    print(f"\r📥 Imported {summary['imported']:,} rows in {summary['seconds']:.1f}s "
+          f"({summary['rows_per_second']:,.0f} rows/s)".ljust(60))
+    if summary['rejected']:
+        print(f"⚠️ Rejected {summary['rejected']:,} invalid rows:")
+        for error in summary['errors']:
+            print(f"   {error}")
+
+def cmd_compact(service, args):
+    policy = RetentionPolicy(args.raw_days, args.hourly_days, args.daily_days)
+    partitions = HistoryPartitions(service.repository, args.partition_period) if args.partition_period else None
+    totals = HistoryCompactor(service.repository, policy, partitions, batch_size=args.batch_size).run_once()
+    print(f"✅ {policy}: {totals['compacted']} rows compacted, "
+          f"{totals['hourly_pruned']} hourly and {totals['daily_pruned']} daily buckets pruned")
+
+def cmd_partitions(service, args):
+    partitions = HistoryPartitions(service.repository, args.period)
+    if args.action == 'seal':
+        print(f"✅ Sealed {partitions.seal()} rows")
+    elif args.action == 'drop':
+        partitions.drop(args.name)
+    elif args.action == 'archive':
+        partitions.archive(args.name, args.dir)
+    
+    for name, range_start, range_end, row_count, archive_path in partitions.partitions():
+        location = f"archived to {archive_path}" if archive_path else "live"
+        print(f"   {name:<28} {range_start} .. {range_end}  {row_count:>9,} rows  {location}")
+
+def cmd_serve(service, args):
+    from weather_server import serve
+    if args.prefetch_top:
+        service.start_prefetch(args.prefetch_top)
+    serve(service, args.host, args.port, save_history=args.save_history, quiet=args.quiet)
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Headless weather lookups backed by weather_forecast_real.db")
+    parser.add_argument('--db', default='weather_forecast_real.db', help="SQLite database path")
+    parser.add_argument('--api-key', default=None, help="OpenWeather API key (default: $OPENWEATHER_API_KEY)")
+    parser.add_argument('--base-url', default=DEFAULT_BASE_URL, help="OpenWeather API base URL")
+    parser.add_argument('--calls-per-minute', type=int, default=60, help="API calls allowed per minute")
+    parser.add_argument('--calls-per-day', type=int, default=None,
+                        help="API calls allowed per day, if your plan has a daily limit (default: none)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    current = subparsers.add_parser('current', help="Show current weather for a city")
+    current.add_argument('city')
+    current.set_defaults(func=cmd_current)
+    
+    forecast = subparsers.add_parser('forecast', help="Show the daily forecast for a city")
+    forecast.add_argument('city')
+    forecast.set_defaults(func=cmd_forecast)
+    
+    search = subparsers.add_parser('search', help="Fetch a city and save it, like the GUI search")
+    search.add_argument('city')
+    search.add_argument('--no-save', action='store_true')
+    search.set_defaults(func=cmd_search)
+    
+    batch = subparsers.add_parser('batch', help="Fetch many cities concurrently")
+    batch.add_argument('cities', nargs='*')
+    batch.add_argument('--file', help="Text file with one city per line")
+    batch.add_argument('--workers', type=int, default=8)
+    batch.add_argument('--no-save', action='store_true')
+    batch.set_defaults(func=cmd_batch)
+    
+    history = subparsers.add_parser('history', help="Show recent searches")
+    history.add_argument('--limit', type=int, default=12)
+    history.add_argument('--resolution', choices=('raw', 'hourly', 'daily'), default='raw',
+                         help="Show compacted hourly/daily aggregates instead of raw searches")
+    history.add_argument('--city', help="Only rows for this city (with --since/--until or --resolution)")
+    history.add_argument('--since', help="Searches at or after this time, e.g. 2026-07-01")
+    history.add_argument('--until', help="Searches before this time; only overlapping partitions are read")
+    history.set_defaults(func=cmd_history)
+    
+    export = subparsers.add_parser('export', help="Stream the database to CSV, JSON Lines or Parquet")
+    export.add_argument('--format', choices=EXPORT_FORMATS, default='csv')
+    export.add_argument('--out', default='.', help="Output directory")
+    export.add_argument('--table', choices=('all', 'history', 'forecast'), default='all')
+    export.add_argument('--chunk-size', type=int, default=5000)
+    export.set_defaults(func=cmd_export)
+    
+    importer = subparsers.add_parser('import', help="Bulk load history observations from CSV or JSON Lines")
+    importer.add_argument('file')
+    importer.add_argument('--format', choices=('csv', 'jsonl'), help="Default: from the file extension")
+    importer.add_argument('--batch-size', type=int, default=50000, help="Rows per transaction")
+    importer.add_argument('--keep-indexes', action='store_true',
+                          help="Maintain indexes row by row instead of rebuilding them afterwards")
+    importer.set_defaults(func=cmd_import)
+    
+    compact = subparsers.add_parser('compact', help="Downsample and prune old history now")
+    compact.add_argument('--raw-days', type=int, default=90, help="Keep raw searches this many days")
+    compact.add_argument('--hourly-days', type=int, default=365, help="Keep hourly aggregates this many days")
+    compact.add_argument('--daily-days', type=int, help="Keep daily aggregates this many days (default: forever)")
+    compact.add_argument('--batch-size', type=int, default=5000, help="Rows per transaction")
+    compact.add_argument('--partition-period', choices=PARTITION_PERIODS,
+                         help="Seal complete periods into partitions first")
+    compact.set_defaults(func=cmd_compact)
+    
+    partitions = subparsers.add_parser('partitions', help="List, seal, drop or archive history partitions")
+    partitions.add_argument('action', nargs='?', choices=('list', 'seal', 'drop', 'archive'), default='list')
+    partitions.add_argument('name', nargs='?', help="Partition to drop or archive")
+    partitions.add_argument('--period', choices=PARTITION_PERIODS, default='month')
+    partitions.add_argument('--dir', default='archive', help="Directory for archived partitions")
+    partitions.set_defaults(func=cmd_partitions)
+    
+    server = subparsers.add_parser('serve', help="Run the HTTP/JSON weather server")
+    server.add_argument('--host', default='127.0.0.1')
+    server.add_argument('--port', type=int, default=8080)
+    server.add_argument('--save-history', action='store_true', help="Record served lookups in weather_history")
+    server.add_argument('--quiet', action='store_true', help="Don't log every request")
+    server.add_argument('--prefetch-top', type=int, default=0,
+                        help="Keep the N most searched cities warm in the cache in the background")
+    server.set_defaults(func=cmd_serve)
+    
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    
+    repository = WeatherRepository(args.db)
+    repository.init_schema()
+    service = WeatherService(
+        args.api_key, args.base_url, repository=repository, cache=TTLCache(max_entries=1024),
+        calls_per_minute=args.calls_per_minute, calls_per_day=args.calls_per_day
+    )
+    
+    try:
+        args.func(service, args)
+    except Exception as e:
+        print(f"❌ {e}")
+        return 1
+    finally:
+        service.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
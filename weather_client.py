@@ -0,0 +1,180 @@
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+def get_weather_icon(condition):
+    """Get weather icon based on condition"""
+    condition = condition.lower()
+    
+    if 'clear' in condition or 'sun' in condition:
+        return "☀️"
+    elif 'cloud' in condition:
+        return "☁️"
+    elif 'rain' in condition or 'drizzle' in condition:
+        return "🌧️"
+    elif 'snow' in condition:
+        return "❄️"
+    elif 'thunder' in condition:
+        return "⛈️"
+    elif 'mist' in condition or 'fog' in condition:
+        return "🌫️"
+    else:
+        return "🌤️"
+
+def parse_current_weather(data):
+    """Convert a /weather response into the app's weather record"""
+    return {
+        'city': data['name'],
+        'country': data.get('sys', {}).get('country'),
+        'temperature': round(data['main']['temp'], 1),
+        'condition': data['weather'][0]['main'],
+        'description': data['weather'][0]['description'].title(),
+        'humidity': data['main']['humidity'],
+        'wind_speed': round(data['wind']['speed'] * 3.6, 1),
+        'pressure': data['main'].get('pressure'),
+        'feels_like': round(data['main']['feels_like'], 1) if 'feels_like' in data['main'] else None,
+        'visibility': data['visibility'] // 1000 if 'visibility' in data else None,
+        'high': round(data['main']['temp_max'], 1),
+        'low': round(data['main']['temp_min'], 1),
+        'icon': data['weather'][0]['icon']
+    }
+
+class WeatherAPIError(Exception):
+    """Raised when the OpenWeather API cannot return a usable response"""
+    
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+    
+    @property
+    def unavailable(self):
+        """True for network errors, rate limiting and server errors; False when the request itself was rejected"""
+        return self.status_code is None or self.status_code == 429 or self.status_code >= 500
+
+class WeatherAPIClient:
+    """Shared HTTP client for OpenWeather with connection pooling and retries"""
+    
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+    
+    def __init__(self, base_url, api_key, pool_connections=4, pool_maxsize=10,
+                 max_retries=3, backoff_base=0.5, backoff_max=30.0, timeout=10,
+                 rate_limiter=None):
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        
+        # The session is created on the first request, so importing requests
+        # (about 100ms) is not paid by programs that never reach the network
+        self.session = None
+        self.session_lock = threading.Lock()
+    
+    def get_session(self):
+        """The pooled requests session, created on first use"""
+        with self.session_lock:
+            if self.session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                
+                # One session keeps TCP connections alive and reuses them across calls.
+                # pool_maxsize is the number of connections kept open per host.
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=self.pool_connections,
+                    pool_maxsize=self.pool_maxsize,
+                    max_retries=0
+                )
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.headers.update({'Connection': 'keep-alive'})
+                self.session = session
+            return self.session
+    
+    def get_json(self, endpoint, params, wait=True):
+        """GET an API endpoint and return the decoded JSON body
+        
+        With wait=False the call never sleeps: it fails with a 429
+        WeatherAPIError when the rate limiter has no token free right now,
+        and failed attempts are not retried.
+        """
+        import requests
+        
+        session = self.get_session()
+        url = f"{self.base_url}/{endpoint.lstrip('/')}"
+        params = dict(params, appid=self.api_key)
+        
+        max_retries = self.max_retries if wait else 0
+        attempt = 0
+        while True:
+            # Every attempt, including retries, counts against the shared quota
+            if self.rate_limiter is not None:
+                if wait:
+                    self.rate_limiter.acquire()
+                elif not self.rate_limiter.try_acquire():
+                    raise WeatherAPIError("Rate limit reached", 429)
+            
+            try:
+                response = session.get(url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= max_retries:
+                    raise WeatherAPIError(f"Network error: {e}")
+                time.sleep(self.backoff_delay(attempt))
+                attempt += 1
+                continue
+            except requests.RequestException as e:
+                raise WeatherAPIError(f"Network error: {e}")
+            
+            if response.status_code == 200:
+                try:
+                    return response.json()
+                except ValueError:
+                    # e.g. a captive portal answering with an HTML page
+                    raise WeatherAPIError("Invalid response: the API did not return JSON")
+            
+            if response.status_code in self.RETRY_STATUSES and attempt < max_retries:
+                delay = self.retry_after_delay(response)
+                if delay is None:
+                    delay = self.backoff_delay(attempt)
+                time.sleep(delay)
+                attempt += 1
+                continue
+            
+            raise WeatherAPIError(f"API Error: {response.status_code}", response.status_code)
+    
+    def backoff_delay(self, attempt):
+        """Exponential backoff with full jitter for the given retry attempt"""
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return random.uniform(0, ceiling)
+    
+    def retry_after_delay(self, response):
+        """Seconds to wait according to a Retry-After header, if present"""
+        value = response.headers.get('Retry-After')
+        if not value:
+            return None
+        
+        try:
+            seconds = float(value)
+        except ValueError:
+            try:
+                retry_at = parsedate_to_datetime(value)
+            except (TypeError, ValueError):
+                return None
+            if retry_at.tzinfo is None:
+                retry_at = retry_at.replace(tzinfo=timezone.utc)
+            seconds = (retry_at - datetime.now(timezone.utc)).total_seconds()
+        
+        return min(self.backoff_max, max(0.0, seconds))
+    
+    def close(self):
+        """Close pooled connections"""
+        with self.session_lock:
+            if self.session is not None:
+                self.session.close()
+                self.session = None
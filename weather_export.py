@@ -0,0 +1,155 @@
+import csv
+import json
+import os
+
+EXPORT_FORMATS = ('csv', 'jsonl', 'parquet')
+
+# (column, CSV header) per table; the headers match what export_all_csv has always written
+EXPORT_COLUMNS = {
+    'weather_history': (
+        ('id', 'ID'), ('city', 'City'), ('country', 'Country'), ('temperature', 'Temperature'),
+        ('condition', 'Condition'), ('description', 'Description'), ('humidity', 'Humidity'),
+        ('wind_speed', 'Wind Speed'), ('pressure', 'Pressure'), ('feels_like', 'Feels Like'),
+        ('visibility', 'Visibility'), ('uv_index', 'UV Index'), ('searched_at', 'Search Date')
+    ),
+    'weather_forecast': (
+        ('id', 'ID'), ('city', 'City'), ('day_name', 'Day Name'), ('forecast_date', 'Forecast Date'),
+        ('high_temp', 'High Temp'), ('low_temp', 'Low Temp'), ('condition', 'Condition'),
+        ('description', 'Description'), ('humidity', 'Humidity'), ('wind_speed', 'Wind Speed'),
+        ('precipitation_chance', 'Precipitation Chance'), ('created_at', 'Created At')
+    )
+}
+
+# Parquet column types; everything else (text, dates, timestamps) is a string
+PARQUET_TYPES = {
+    'id': 'int64', 'humidity': 'int64', 'pressure': 'int64', 'visibility': 'int64',
+    'precipitation_chance': 'int64', 'temperature': 'float64', 'wind_speed': 'float64',
+    'feels_like': 'float64', 'uv_index': 'float64', 'high_temp': 'float64', 'low_temp': 'float64'
+}
+
+EXPORT_ORDER = {
+    'weather_history': 'searched_at DESC, id DESC',
+    'weather_forecast': 'city, forecast_date'
+}
+
+class ExportCancelled(Exception):
+    """Raised when an export is cancelled part-way through"""
+
+def parquet_available():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+class CSVSink:
+    def __init__(self, path, columns):
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow([header for _, header in columns])
+    
+    def write(self, rows):
+        self.writer.writerows(rows)
+    
+    def close(self):
+        self.file.close()
+
+class JSONLinesSink:
+    def __init__(self, path, columns):
+        self.file = open(path, 'w', encoding='utf-8')
+        self.names = [name for name, _ in columns]
+    
+    def write(self, rows):
+        self.file.writelines(json.dumps(dict(zip(self.names, row)), default=str) + '\n' for row in rows)
+    
+    def close(self):
+        self.file.close()
+
+class ParquetSink:
+    def __init__(self, path, columns):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+        
+        self.pa = pa
+        self.names = [name for name, _ in columns]
+        self.schema = pa.schema([(name, getattr(pa, PARQUET_TYPES.get(name, 'string'))()) for name in self.names])
+        self.writer = pq.ParquetWriter(path, self.schema)
+    
+    def write(self, rows):
+        columns = {name: [row[index] for row in rows] for index, name in enumerate(self.names)}
+        self.writer.write_table(self.pa.Table.from_pydict(columns, schema=self.schema))
+    
+    def close(self):
+        self.writer.close()
+
+SINKS = {
+    'csv': CSVSink,
+    'jsonl': JSONLinesSink,
+    'parquet': ParquetSink
+}
+
+def export_table(repository, table, path, fmt='csv', chunk_size=5000, progress=None, cancelled=None):
+    """Stream one table to a file in chunks and return the number of rows written
+    
+    Rows are read with fetchmany on a pooled reader connection, so the export
+    sees one consistent snapshot and never holds more than chunk_size rows.
+    weather_history includes its sealed partitions, newest first.
+    progress(rows_done, total_rows) is called after each chunk; when
+    cancelled() returns True the partial file is removed and ExportCancelled
+    is raised.
+    """
+    if fmt not in SINKS:
+        raise ValueError(f"Unknown export format {fmt!r}; choose from {', '.join(EXPORT_FORMATS)}")
+    
+    columns = EXPORT_COLUMNS[table]
+    temp_path = path + '.part'
+    sink = SINKS[fmt](temp_path, columns)
+    done = 0
+    
+    try:
+        with repository.db.snapshot() as conn:
+            sources = repository.history_tables(conn) if table == 'weather_history' else [table]
+            total = sum(conn.execute(f"SELECT COUNT(*) FROM {source}").fetchone()[0] for source in sources)
+            
+            for source in sources:
+                cursor = conn.execute(
+                    f"SELECT {', '.join(name for name, _ in columns)} FROM {source} ORDER BY {EXPORT_ORDER[table]}"
+                )
+                while True:
+                    if cancelled is not None and cancelled():
+                        raise ExportCancelled(f"Export of {table} cancelled after {done} rows")
+                    
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    sink.write(rows)
+                    done += len(rows)
+                    if progress is not None:
+                        progress(done, total)
+    
+    except BaseException:
+        sink.close()
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    
+    sink.close()
+    os.replace(temp_path, path)
+    return done
+
+def export_all(repository, directory, fmt='csv', chunk_size=5000, progress=None, cancelled=None):
+    """Export history and forecasts into a directory; returns {path: rows}
+    
+    progress(table, rows_done, total_rows) is called after each chunk.
+    """
+    results = {}
+    for table in EXPORT_COLUMNS:
+        path = os.path.join(directory, f"{table}.{fmt}")
+        table_progress = None
+        if progress is not None:
+            table_progress = lambda done, total, table=table: progress(table, done, total)
+        results[path] = export_table(repository, table, path, fmt, chunk_size, table_progress, cancelled)
+    return results
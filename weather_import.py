@@ -0,0 +1,185 @@
+import csv
+import json
+import math
+import os
+import time
+from datetime import datetime, timezone
+
+from schema_migrations import defer_history_objects, history_import_lock, restore_history_objects
+from weather_export import EXPORT_COLUMNS
+
+IMPORT_COLUMNS = (
+    'city', 'country', 'temperature', 'condition', 'description', 'humidity',
+    'wind_speed', 'pressure', 'feels_like', 'visibility', 'uv_index', 'searched_at'
+)
+
+IMPORT_HISTORY_SQL = f'''
+    INSERT INTO weather_history ({', '.join(IMPORT_COLUMNS)})
+    VALUES ({', '.join('?' for _ in IMPORT_COLUMNS)})
+'''
+
+INTEGER_COLUMNS = ('humidity', 'pressure', 'visibility')
+REAL_COLUMNS = ('temperature', 'wind_speed', 'feels_like', 'uv_index')
+
+# CSV headers may be the column names or the headers export_all_csv writes
+HEADER_ALIASES = {header.lower(): column for column, header in EXPORT_COLUMNS['weather_history']}
+HEADER_ALIASES.update({column: column for column in IMPORT_COLUMNS})
+
+def read_csv(path):
+    """Yield (line number, record) from a CSV file with a header row"""
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        columns = [HEADER_ALIASES.get(name.strip().lower()) for name in header]
+        
+        for line_number, values in enumerate(reader, 2):
+            yield line_number, {column: value for column, value in zip(columns, values) if column}
+
+def read_jsonl(path):
+    """Yield (line number, record) from a JSON Lines file"""
+    with open(path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except ValueError:
+                yield line_number, None
+
+READERS = {
+    'csv': read_csv,
+    'jsonl': read_jsonl
+}
+
+def parse_number(value, cast):
+    if value is None or value == '':
+        return None
+    if isinstance(value, str):
+        # Tolerate the unit suffixes the viewer displays
+        value = value.replace('°C', '').replace('%', '').replace('km/h', '').replace('hPa', '').replace('km', '').strip()
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f"not a finite number: {value!r}")
+    return cast(number) if cast is int else cast(value)
+
+def parse_timestamp(value, default):
+    """Normalise a timestamp to SQLite's 'YYYY-MM-DD HH:MM:SS' (UTC if it carries an offset)"""
+    if value is None or value == '':
+        return default
+    dt = datetime.fromisoformat(str(value).strip().replace('Z', '+00:00'))
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt.strftime('%Y-%m-%d %H:%M:%S')
+
+def validate_history_record(record, default_timestamp):
+    """Check one record against the weather_history schema and return its row tuple
+    
+    Raises ValueError describing the first problem found.
+    """
+    if not isinstance(record, dict):
+        raise ValueError("not a valid JSON object")
+    
+    row = {}
+    for column in ('city', 'condition'):
+        value = record.get(column)
+        if value is None or not str(value).strip():
+            raise ValueError(f"missing {column}")
+        row[column] = str(value).strip()
+    
+    for column in ('country', 'description'):
+        value = record.get(column)
+        row[column] = str(value).strip() if value is not None else None
+        row[column] = row[column] or None
+    
+    for column in INTEGER_COLUMNS + REAL_COLUMNS:
+        try:
+            row[column] = parse_number(record.get(column), int if column in INTEGER_COLUMNS else float)
+        except (TypeError, ValueError):
+            raise ValueError(f"{column} is not a number: {record.get(column)!r}")
+    
+    if row['temperature'] is None:
+        raise ValueError("missing temperature")
+    if row['humidity'] is not None and not 0 <= row['humidity'] <= 100:
+        raise ValueError(f"humidity out of range: {row['humidity']}")
+    
+    try:
+        row['searched_at'] = parse_timestamp(record.get('searched_at'), default_timestamp)
+    except ValueError:
+        raise ValueError(f"searched_at is not a timestamp: {record.get('searched_at')!r}")
+    
+    return tuple(row[column] for column in IMPORT_COLUMNS)
+
+class HistoryImporter:
+    """Bulk loads observations into weather_history
+    
+    Rows are streamed from the file, validated and inserted with executemany
+    in batch_size-row transactions. With defer_indexes the history indexes
+    and the full-text/rollup triggers are dropped for the load and rebuilt
+    once at the end, which is much cheaper than maintaining them per row.
+    """
+    
+    def __init__(self, repository, batch_size=50000, defer_indexes=True, max_errors=20):
+        self.repository = repository
+        self.batch_size = batch_size
+        self.defer_indexes = defer_indexes
+        self.max_errors = max_errors
+    
+    def import_file(self, path, fmt=None, progress=None):
+        """Import a CSV or JSONL file and return a summary dict
+        
+        progress(rows_imported, rows_rejected) is called after each batch.
+        """
+        fmt = fmt or os.path.splitext(path)[1].lstrip('.').lower()
+        if fmt not in READERS:
+            raise ValueError(f"Unknown import format {fmt!r}; use csv or jsonl")
+        
+        default_timestamp = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        imported = 0
+        rejected = 0
+        errors = []
+        start = time.perf_counter()
+        
+        with self.repository.db.writer() as conn, history_import_lock(conn):
+            deferred = defer_history_objects(conn) if self.defer_indexes else 0
+            try:
+                batch = []
+                for line_number, record in READERS[fmt](path):
+                    try:
+                        batch.append(validate_history_record(record, default_timestamp))
+                    except ValueError as e:
+                        rejected += 1
+                        if len(errors) < self.max_errors:
+                            errors.append(f"line {line_number}: {e}")
+                        continue
+                    
+                    if len(batch) >= self.batch_size:
+                        imported += self.insert_batch(conn, batch)
+                        batch = []
+                        if progress is not None:
+                            progress(imported, rejected)
+                
+                if batch:
+                    imported += self.insert_batch(conn, batch)
+                    if progress is not None:
+                        progress(imported, rejected)
+            finally:
+                if deferred:
+                    restore_history_objects(conn)
+        
+        self.repository.db.checkpoint('TRUNCATE')
+        seconds = time.perf_counter() - start
+        return {
+            'imported': imported,
+            'rejected': rejected,
+            'errors': errors,
+            'seconds': seconds,
+            'rows_per_second': imported / seconds if seconds > 0 else 0.0
+        }
+    
+    @staticmethod
+    def insert_batch(conn, batch):
+        with conn:
+            conn.executemany(IMPORT_HISTORY_SQL, batch)
+        return len(batch)
@@ -0,0 +1,139 @@
+import threading
+import time
+
+from forecast_engine import aggregate_forecast
+from weather_client import WeatherAPIError
+
+SECONDS_PER_DAY = 86400
+CALLS_PER_CITY = 2  # /weather and /forecast
+
+class PrefetchScheduler:
+    """Keeps the most searched cities' weather and forecast warm in the background
+    
+    The cities come from the city_stats rollup (searches per city), with any
+    favourites first. Each cycle refreshes every city once, one city every
+    interval / cities seconds, so the calls are spread out instead of
+    bursting. The interval is stretched until prefetching uses at most
+    budget_share of the shared rate limiter's per-minute and per-day quota.
+    Prefetch calls never wait on the limiter: when interactive calls are
+    queued or no token is free, the rest of the cycle is skipped, so the
+    worker never sits in acquire() and close() returns promptly.
+    
+    Responses replace the cache entries searches read, so a lookup for a
+    warm city needs no network call, and each forecast is saved so the
+    offline read path has it. Current weather is not written to
+    weather_history: prefetches are not searches and must not count as them.
+    """
+    
+    def __init__(self, service, top_n=10, favourites=(), budget_share=0.5, min_interval=None, start_delay=5,
+                 close_timeout=15):
+        if not 0 < budget_share <= 1:
+            raise ValueError("budget_share must be in (0, 1]")
+        self.service = service
+        self.top_n = top_n
+        self.favourites = list(favourites)
+        self.budget_share = budget_share
+        # Refreshing more often than the cache TTL would not make anything warmer
+        self.min_interval = min_interval if min_interval is not None else service.cache_ttls['weather']
+        self.start_delay = start_delay
+        # Bounds close() even if a request is in flight; the worker is a daemon thread
+        self.close_timeout = close_timeout
+        
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.prefetched = 0
+        self.skipped = 0
+        self.failed = 0
+    
+    def cities(self):
+        """Favourites, then the most searched cities, without repeats, up to top_n"""
+        cities = {}
+        for city in self.favourites + [row[0] for row in self.service.repository.top_cities(self.top_n)]:
+            city = ' '.join(city.split())
+            if city:
+                cities.setdefault(city.casefold(), city)
+        return list(cities.values())[:max(self.top_n, len(self.favourites))]
+    
+    def refresh_interval(self, city_count):
+        """Seconds between two refreshes of the same city that keep within the budget"""
+        interval = self.min_interval
+        limiter = self.service.client.rate_limiter
+        if limiter is None or not city_count:
+            return interval
+        
+        calls_per_cycle = city_count * CALLS_PER_CITY
+        interval = max(interval, calls_per_cycle * 60 / (limiter.calls_per_minute * self.budget_share))
+        if limiter.calls_per_day:
+            interval = max(interval, calls_per_cycle * SECONDS_PER_DAY / (limiter.calls_per_day * self.budget_share))
+        return interval
+    
+    def prefetch_city(self, city):
+        """Refresh one city's cached weather and forecast and store the forecast
+        
+        Raises WeatherAPIError with status 429 when the rate limiter has no
+        token free right now, rather than waiting for one.
+        """
+        self.service.refresh_json('weather', city, wait=False)
+        forecast_data = aggregate_forecast(self.service.refresh_json('forecast', city, wait=False))
+        self.service.save_forecast(city, forecast_data)
+        self.prefetched += 1
+        return True
+    
+    def run_once(self, spacing=0.0):
+        """Refresh every city once, spacing seconds apart; returns the cities refreshed"""
+        refreshed = []
+        cities = self.cities()
+        for index, city in enumerate(cities):
+            if self.stop_event.is_set():
+                break
+            try:
+                if self.prefetch_city(city):
+                    refreshed.append(city)
+            except WeatherAPIError as e:
+                if e.status_code != 429:
+                    self.failed += 1
+                    print(f"⚠️ Prefetch failed for {city}: {e}")
+                else:
+                    # Searches are waiting or the quota is spent; try again next cycle
+                    self.skipped += len(cities) - index
+                    print(f"⏸️ Prefetch paused: rate limit reached, skipped {len(cities) - index} cities")
+                    break
+            except Exception as e:
+                self.failed += 1
+                print(f"⚠️ Prefetch failed for {city}: {e}")
+            self.stop_event.wait(spacing)
+        return refreshed
+    
+    def run(self):
+        self.stop_event.wait(self.start_delay)
+        while not self.stop_event.is_set():
+            try:
+                cities = self.cities()
+            except Exception as e:
+                print(f"❌ Prefetch failed: {e}")
+                cities = []
+            
+            interval = self.refresh_interval(len(cities))
+            if not cities:
+                self.stop_event.wait(interval)
+                continue
+            
+            started = time.monotonic()
+            refreshed = self.run_once(interval / len(cities))
+            if refreshed:
+                print(f"🔄 Prefetched {len(refreshed)} cities (each refreshed every {interval:.0f}s)")
+            # A cycle cut short by the rate limit still lasts a full interval
+            self.stop_event.wait(max(0.0, interval - (time.monotonic() - started)))
+    
+    def start(self):
+        """Prefetch in the background until close()"""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name="weather-prefetch", daemon=True)
+            self.thread.start()
+        return self
+    
+    def close(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(self.close_timeout)
+            self.thread = None
@@ -0,0 +1,592 @@
+import sqlite3
+import threading
+import time
+
+from db_manager import get_manager
+from history_partitions import drop_partition, live_partitions
+from schema_migrations import migrate, rebuild_rollups
+
+HISTORY_COLUMNS = (
+    'id', 'city', 'country', 'temperature', 'condition', 'description',
+    'humidity', 'wind_speed', 'pressure', 'feels_like', 'visibility', 'searched_at'
+)
+
+FORECAST_COLUMNS = (
+    'id', 'city', 'day_name', 'forecast_date', 'high_temp', 'low_temp', 'condition',
+    'description', 'humidity', 'wind_speed', 'precipitation_chance', 'created_at'
+)
+
+# Sortable columns and the ORDER BY expression for each; city sorts
+# case-insensitively so it can walk idx_weather_history_city_nocase
+HISTORY_SORT_EXPRESSIONS = dict(
+    {column: column for column in HISTORY_COLUMNS},
+    city='city COLLATE NOCASE'
+)
+
+FORECAST_SORT_EXPRESSIONS = dict(
+    {column: column for column in FORECAST_COLUMNS},
+    city='city COLLATE NOCASE'
+)
+
+# Downsampled history per resolution, filled by weather_retention.HistoryCompactor
+AGGREGATE_TABLES = {
+    'hourly': 'weather_history_hourly',
+    'daily': 'weather_history_daily'
+}
+
+INSERT_HISTORY_SQL = '''
+    INSERT INTO weather_history
+    (city, country, temperature, condition, description, humidity,
+     wind_speed, pressure, feels_like, visibility, uv_index)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+UPSERT_FORECAST_SQL = '''
+    INSERT INTO weather_forecast
+    (city, day_name, forecast_date, high_temp, low_temp, condition,
+     description, humidity, wind_speed, precipitation_chance)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(city, forecast_date) DO UPDATE SET
+        day_name = excluded.day_name,
+        high_temp = excluded.high_temp,
+        low_temp = excluded.low_temp,
+        condition = excluded.condition,
+        description = excluded.description,
+        humidity = excluded.humidity,
+        wind_speed = excluded.wind_speed,
+        precipitation_chance = excluded.precipitation_chance,
+        created_at = CURRENT_TIMESTAMP
+'''
+
+def is_busy_error(error):
+    """Whether a sqlite3 error is transient: the database was busy or locked"""
+    code = getattr(error, 'sqlite_errorcode', None)
+    return code is not None and code & 0xff in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+
+def escape_like(text):
+    """Escape LIKE wildcards so user input matches literally"""
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def union_all(tables, select):
+    """The same SELECT over several tables; select names its table as {table}"""
+    return ' UNION ALL '.join(select.format(table=table) for table in tables)
+
+class WeatherRepository:
+    """All SQL access to weather_forecast_real.db, shared by the GUI, viewer and CLI"""
+    
+    def __init__(self, db_path='weather_forecast_real.db'):
+        self.db_path = db_path
+        self.db = get_manager(db_path)
+        self.search_index = None
+    
+    def execute(self, sql, params=(), cancelled=None):
+        """Run a read query on a pooled reader connection"""
+        return self.db.read(sql, params, cancelled)
+    
+    def init_schema(self):
+        """Create or upgrade the schema to the latest migration"""
+        with self.db.writer() as conn:
+            migrate(conn)
+        self.search_index = None
+    
+    def has_search_index(self):
+        """Whether the trigram full-text index over history exists"""
+        if self.search_index is None:
+            self.search_index = bool(self.execute(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name='weather_history_fts'"
+            ))
+        return self.search_index
+    
+    def save_weather(self, data):
+        """Insert one current-weather record"""
+        self.save_batch([data], [])
+    
+    def save_forecast(self, city, forecast_data):
+        """Replace the stored forecast for a city"""
+        self.save_batch([], [(city, forecast_data)])
+    
+    def save_batch(self, weather_records, forecasts):
+        """Write weather records and (city, forecast) pairs in one transaction"""
+        with self.db.writer() as conn:
+            with conn:
+                conn.executemany(INSERT_HISTORY_SQL, [
+                    (data['city'], data.get('country'), data['temperature'], data['condition'],
+                     data.get('description'), data['humidity'], data['wind_speed'],
+                     data.get('pressure'), data.get('feels_like'), data.get('visibility'), None)
+                    for data in weather_records
+                ])
+                
+                conn.executemany(UPSERT_FORECAST_SQL, [
+                    (city, day['day'], day['date'], day['high'], day['low'], day['condition'],
+                     day.get('description'), day.get('humidity'), day.get('wind_speed'),
+                     day.get('precipitation_chance'))
+                    for city, forecast_data in forecasts for day in forecast_data
+                ])
+                
+                # Drop days that are no longer part of each city's forecast window
+                conn.executemany('''
+                    DELETE FROM weather_forecast
+                    WHERE city = ? AND (forecast_date < ? OR forecast_date > ?)
+                ''', [
+                    (city, min(day['date'] for day in forecast_data), max(day['date'] for day in forecast_data))
+                    for city, forecast_data in forecasts if forecast_data
+                ])
+    
+    def insert_history_rows(self, rows):
+        """Insert full history rows (city, country, ..., uv_index)"""
+        with self.db.writer() as conn:
+            with conn:
+                conn.executemany(INSERT_HISTORY_SQL, rows)
+    
+    def insert_forecast_rows(self, rows):
+        """Insert full forecast rows (city, day_name, ..., precipitation_chance)"""
+        with self.db.writer() as conn:
+            with conn:
+                conn.executemany(UPSERT_FORECAST_SQL, rows)
+    
+    def delete_history_record(self, record_id):
+        """Delete one history row, whether it is live or sealed in a partition"""
+        with self.db.writer() as conn:
+            with conn:
+                deleted = conn.execute('DELETE FROM weather_history WHERE id = ?', (record_id,)).rowcount
+                for partition in ([] if deleted else live_partitions(conn)):
+                    deleted = conn.execute(f'DELETE FROM {partition} WHERE id = ?', (record_id,)).rowcount
+                    if deleted:
+                        conn.execute(
+                            'UPDATE history_partitions SET row_count = row_count - 1 WHERE name = ?', (partition,)
+                        )
+                        break
+                return deleted
+    
+    def delete_forecast_record(self, record_id):
+        return self._delete('DELETE FROM weather_forecast WHERE id = ?', (record_id,))
+    
+    def delete_city_forecasts(self, city):
+        return self._delete('DELETE FROM weather_forecast WHERE city = ?', (city,))
+    
+    def clear_history(self):
+        """Delete all history, dropping sealed partitions whole"""
+        with self.db.writer() as conn:
+            with conn:
+                count = 0
+                for partition in live_partitions(conn):
+                    count += conn.execute(
+                        'SELECT row_count FROM history_partitions WHERE name = ?', (partition,)
+                    ).fetchone()[0]
+                    drop_partition(conn, partition)
+                count += conn.execute('DELETE FROM weather_history').rowcount
+                rebuild_rollups(conn)
+                return count
+    
+    def clear_forecasts(self):
+        return self._delete('DELETE FROM weather_forecast')
+    
+    def _delete(self, sql, params=()):
+        with self.db.writer() as conn:
+            with conn:
+                return conn.execute(sql, params).rowcount
+    
+    def history_tables(self, conn, start=None, end=None):
+        """weather_history plus the sealed partitions overlapping [start, end), newest first
+        
+        Call inside db.snapshot() so a partition dropped meanwhile is not
+        queried. The live table is always included: rows for old periods
+        stay there until the next seal.
+        """
+        return ['weather_history'] + live_partitions(conn, start, end)
+    
+    def recent_history(self, limit=12):
+        """Most recent searches as (city, temperature, condition, searched_at)"""
+        with self.db.snapshot() as conn:
+            sql = union_all(self.history_tables(conn), "SELECT city, temperature, condition, searched_at FROM {table}")
+            return conn.execute(sql + " ORDER BY searched_at DESC LIMIT ?", (limit,)).fetchall()
+    
+    def history_between(self, start=None, end=None, city=None, limit=None):
+        """History rows (HISTORY_COLUMNS order) searched in [start, end), oldest first
+        
+        Only partitions overlapping the range are read; None leaves that
+        side of the range open.
+        """
+        conditions = ["searched_at IS NOT NULL"]
+        params = []
+        if start is not None:
+            conditions.append("searched_at >= ?")
+            params.append(start)
+        if end is not None:
+            conditions.append("searched_at < ?")
+            params.append(end)
+        if city:
+            conditions.append("city = ? COLLATE NOCASE")
+            params.append(city)
+        
+        with self.db.snapshot() as conn:
+            tables = self.history_tables(conn, start, end)
+            sql = union_all(tables, f"SELECT {', '.join(HISTORY_COLUMNS)} FROM {{table}} WHERE {' AND '.join(conditions)}")
+            sql += " ORDER BY searched_at, id"
+            all_params = params * len(tables)
+            if limit is not None:
+                sql += " LIMIT ?"
+                all_params.append(limit)
+            return conn.execute(sql, all_params).fetchall()
+    
+    def history_page(self, filter_city=None, after=None, limit=200, sort_column='searched_at', descending=True,
+                     cancelled=None):
+        """One page of history rows (HISTORY_COLUMNS order), newest first by default
+        
+        Keyset-paginated on (sort_column, id): pass the (value, id) of the
+        previous page's last row as after. Sorting happens in SQL on the raw
+        typed column, so each page is a range scan when the column is
+        indexed (searched_at, city, id) and a single top-N pass otherwise.
+        
+        filter_city matches anywhere in city, country or description through
+        the trigram index; shorter terms than a trigram fall back to a city
+        prefix match. Sealed partitions have no trigram index and are
+        matched with LIKE instead.
+        
+        Sealed partitions are read alongside the live table; SQLite merges
+        the per-table index scans, so a page still reads about limit rows.
+        """
+        search_index = bool(filter_city) and len(filter_city) >= 3 and self.has_search_index()
+        
+        with self.db.snapshot() as conn:
+            sources = []
+            for table in self.history_tables(conn):
+                conditions = []
+                params = []
+                if search_index and table == 'weather_history':
+                    conditions.append("id IN (SELECT rowid FROM weather_history_fts WHERE weather_history_fts MATCH ?)")
+                    params.append('"' + filter_city.replace('"', '""') + '"')
+                elif search_index:
+                    conditions.append("(city LIKE ? ESCAPE '\\' OR country LIKE ? ESCAPE '\\' "
+                                      "OR description LIKE ? ESCAPE '\\')")
+                    params.extend(['%' + escape_like(filter_city) + '%'] * 3)
+                elif filter_city:
+                    # A prefix pattern lets SQLite use the city COLLATE NOCASE index
+                    conditions.append("city LIKE ? ESCAPE '\\'")
+                    params.append(escape_like(filter_city) + '%')
+                sources.append((table, conditions, params))
+            
+            return self.keyset_page(
+                conn, sources, HISTORY_COLUMNS, HISTORY_SORT_EXPRESSIONS,
+                sort_column, descending, after, limit, cancelled
+            )
+    
+    def keyset_page(self, conn, sources, columns, sort_expressions,
+                    sort_column, descending, after, limit, cancelled=None):
+        """Fetch one page ordered by (sort_column, id) after the given key
+        
+        sources is a list of (table, conditions, params); several tables are
+        combined with UNION ALL under one ORDER BY, which SQLite runs as a
+        merge of the sorted per-table scans. NULLs sort last in either
+        direction: non-NULL values are paged first with a row-value
+        comparison, then NULL rows by id.
+        """
+        if sort_column not in sort_expressions:
+            raise ValueError(f"Cannot sort by {sort_column!r}")
+        
+        expression = sort_expressions[sort_column]
+        direction, compare = ('DESC', '<') if descending else ('ASC', '>')
+        
+        def page(keyset, keyset_params, order, count):
+            selects = []
+            all_params = []
+            for table, conditions, params in sources:
+                selects.append(f"SELECT {', '.join(columns)} FROM {table} WHERE " + " AND ".join(conditions + keyset))
+                all_params += params + keyset_params
+            return self.db.query(
+                conn, " UNION ALL ".join(selects) + f" ORDER BY {order} LIMIT ?", all_params + [count], cancelled
+            )
+        
+        rows = []
+        if after is None or after[0] is not None:
+            keyset = [f"{sort_column} IS NOT NULL"]
+            keyset_params = []
+            if after is not None:
+                keyset.append(f"({expression}, id) {compare} (?, ?)")
+                keyset_params = list(after)
+            rows = page(keyset, keyset_params, f"{expression} {direction}, id {direction}", limit)
+            if len(rows) == limit:
+                return rows
+            after = None
+        
+        keyset = [f"{sort_column} IS NULL"]
+        keyset_params = []
+        if after is not None:
+            keyset.append(f"id {compare} ?")
+            keyset_params = [after[1]]
+        return rows + page(keyset, keyset_params, f"id {direction}", limit - len(rows))
+    
+    def history_records(self, city=None, limit=50):
+        """Newest history rows (HISTORY_COLUMNS order), optionally for one city"""
+        select = f"SELECT {', '.join(HISTORY_COLUMNS)} FROM {{table}}"
+        params = []
+        if city:
+            select += " WHERE city = ? COLLATE NOCASE"
+            params.append(city)
+        
+        with self.db.snapshot() as conn:
+            tables = self.history_tables(conn)
+            return conn.execute(
+                union_all(tables, select) + " ORDER BY searched_at DESC LIMIT ?", params * len(tables) + [limit]
+            ).fetchall()
+    
+    def forecast_rows(self, filter_city=None, sort_column=None, descending=False):
+        """Forecast rows in FORECAST_COLUMNS order, by city and date unless sort_column is given
+        
+        The table holds at most one row per city and day, so it is sorted in
+        SQL but not paged.
+        """
+        sql = f"SELECT {', '.join(FORECAST_COLUMNS)} FROM weather_forecast"
+        params = ()
+        if filter_city:
+            sql += " WHERE city = ?"
+            params = (filter_city,)
+        
+        if sort_column is None:
+            return self.execute(sql + " ORDER BY city, forecast_date", params)
+        if sort_column not in FORECAST_SORT_EXPRESSIONS:
+            raise ValueError(f"Cannot sort weather_forecast by {sort_column!r}")
+        
+        direction = 'DESC' if descending else 'ASC'
+        return self.execute(
+            sql + f" ORDER BY {sort_column} IS NULL, {FORECAST_SORT_EXPRESSIONS[sort_column]} {direction}, id {direction}",
+            params
+        )
+    
+    def latest_weather(self, city=None):
+        """The newest stored search for a city, or for any city with None
+        
+        Returns one row in HISTORY_COLUMNS order, or None. Each table is read
+        newest first through idx_weather_history_city_nocase (or the
+        searched_at index without a city), so this is one indexed lookup
+        per partition.
+        """
+        condition, params = ("city = ? COLLATE NOCASE", (city,)) if city else ("searched_at IS NOT NULL", ())
+        with self.db.snapshot() as conn:
+            tables = self.history_tables(conn)
+            return conn.execute(union_all(
+                tables, f"SELECT {', '.join(HISTORY_COLUMNS)} FROM {{table}} WHERE {condition}"
+            ) + " ORDER BY searched_at DESC, id DESC LIMIT 1", params * len(tables)).fetchone()
+    
+    def latest_forecast(self, city, start):
+        """Stored forecast days for a city from the start date on, in FORECAST_COLUMNS order
+        
+        A city stored under different spellings (Paris, paris) gives one row
+        per day, the most recently saved.
+        """
+        rows = self.execute(f'''
+            SELECT {', '.join(FORECAST_COLUMNS)} FROM weather_forecast
+            WHERE city = ? COLLATE NOCASE AND forecast_date >= ?
+            ORDER BY forecast_date, created_at DESC, id DESC
+        ''', (city, start))
+        
+        days = {}
+        for row in rows:
+            days.setdefault(row[3], row)
+        return list(days.values())
+    
+    def forecast_cities(self):
+        return [row[0] for row in self.execute("SELECT DISTINCT city FROM weather_forecast ORDER BY city")]
+    
+    def history_version(self):
+        """Cheap change marker for history: (newest live id, total rows)
+        
+        Saves raise the first and deletes lower the second, so a caller can
+        skip re-reading history while it is unchanged.
+        """
+        return self.execute('''
+            SELECT (SELECT MAX(id) FROM weather_history),
+                   (SELECT COALESCE(SUM(search_count), 0) FROM city_stats)
+        ''')[0]
+    
+    def count_history(self):
+        return self.execute("SELECT COALESCE(SUM(search_count), 0) FROM city_stats")[0][0]
+    
+    def count_forecasts(self):
+        return self.execute("SELECT COUNT(*) FROM weather_forecast")[0][0]
+    
+    def history_date_range(self):
+        # Separate subqueries so each is a single lookup on a searched_at index
+        with self.db.snapshot() as conn:
+            return conn.execute("SELECT MIN(oldest), MAX(newest) FROM (" + union_all(
+                self.history_tables(conn),
+                "SELECT (SELECT MIN(searched_at) FROM {table} WHERE searched_at IS NOT NULL) AS oldest, "
+                "(SELECT MAX(searched_at) FROM {table}) AS newest"
+            ) + ")").fetchone()
+    
+    def history_summary(self):
+        """Totals from the city_stats rollup, O(number of cities)
+        
+        Returns (searches, cities, avg temp, min temp, max temp,
+        avg humidity, avg wind speed, avg pressure).
+        """
+        return self.execute('''
+            SELECT COALESCE(SUM(search_count), 0), COUNT(*),
+                   SUM(temp_sum) / SUM(search_count), MIN(temp_min), MAX(temp_max),
+                   SUM(humidity_sum) / NULLIF(SUM(humidity_count), 0),
+                   SUM(wind_sum) / NULLIF(SUM(wind_count), 0),
+                   SUM(pressure_sum) / NULLIF(SUM(pressure_count), 0)
+            FROM city_stats
+        ''')[0]
+    
+    def top_cities(self, limit=10):
+        """Most searched cities as (city, searches)"""
+        return self.execute(
+            "SELECT city, search_count FROM city_stats ORDER BY search_count DESC, city LIMIT ?", (limit,)
+        )
+    
+    def condition_counts(self):
+        """Searches per weather condition as (condition, searches)"""
+        return self.execute("SELECT condition, search_count FROM condition_stats ORDER BY search_count DESC")
+    
+    def history_aggregates(self, resolution='daily', city=None, limit=100):
+        """Newest compacted buckets as (city, bucket, samples, temp min/max/mean,
+        humidity min/max/mean, wind min/max/mean)"""
+        if resolution not in AGGREGATE_TABLES:
+            raise ValueError(f"Unknown resolution {resolution!r}; use hourly or daily")
+        
+        sql = f'''
+            SELECT city, bucket, samples, temp_min, temp_max, temp_sum / samples,
+                   humidity_min, humidity_max, humidity_sum / NULLIF(humidity_count, 0),
+                   wind_min, wind_max, wind_sum / NULLIF(wind_count, 0)
+            FROM {AGGREGATE_TABLES[resolution]}
+        '''
+        params = []
+        if city:
+            sql += " WHERE city = ? COLLATE NOCASE"
+            params.append(city)
+        params.append(limit)
+        return self.execute(sql + " ORDER BY bucket DESC, city LIMIT ?", params)
+    
+    def close(self):
+        self.db.close()
+
+class BatchWriter:
+    """Queues weather/forecast saves and writes them in batched transactions
+    
+    Pending records are flushed with executemany inside one transaction when
+    max_batch records are queued or flush_interval seconds have passed,
+    instead of paying one commit (and fsync) per saved row.
+    
+    If the batch fails because the database is busy or locked, it is put
+    back at the front of the queue for the next flush. Any other failure
+    means some record is bad, so the batch is retried one record at a time
+    and only the records that fail are rejected.
+    """
+    
+    def __init__(self, repository, max_batch=500, flush_interval=1.0):
+        self.repository = repository
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        
+        self.weather_records = []
+        self.forecasts = {}  # city -> latest forecast; later saves replace earlier ones
+        self.condition = threading.Condition()
+        self.flush_lock = threading.Lock()
+        self.closed = False
+        self.flushed_records = 0
+        self.rejected_records = 0
+        
+        self.thread = threading.Thread(target=self.run, name="weather-batch-writer", daemon=True)
+        self.thread.start()
+    
+    def pending(self):
+        return len(self.weather_records) + len(self.forecasts)
+    
+    def add_weather(self, data):
+        with self.condition:
+            self.weather_records.append(data)
+            if self.pending() >= self.max_batch:
+                self.condition.notify()
+    
+    def add_forecast(self, city, forecast_data):
+        with self.condition:
+            self.forecasts[city] = forecast_data
+            if self.pending() >= self.max_batch:
+                self.condition.notify()
+    
+    def flush(self):
+        """Write everything queued so far in one transaction"""
+        with self.flush_lock:
+            with self.condition:
+                weather_records, self.weather_records = self.weather_records, []
+                forecasts, self.forecasts = self.forecasts, {}
+            
+            if not weather_records and not forecasts:
+                return 0
+            
+            try:
+                self.repository.save_batch(weather_records, list(forecasts.items()))
+            except Exception as e:
+                if is_busy_error(e):
+                    print(f"⚠️ Batch write failed ({len(weather_records)} records), retrying on the next flush: {e}")
+                    self.requeue(weather_records, forecasts)
+                    return 0
+                print(f"⚠️ Batch write failed ({len(weather_records)} records), saving one at a time: {e}")
+                return self.flush_one_by_one(weather_records, forecasts)
+            
+            return self.saved(len(weather_records), len(forecasts))
+    
+    def flush_one_by_one(self, weather_records, forecasts):
+        saved_weather = saved_forecasts = 0
+        items = [('weather', data) for data in weather_records] + [('forecast', item) for item in forecasts.items()]
+        for index, (kind, item) in enumerate(items):
+            try:
+                if kind == 'weather':
+                    self.repository.save_batch([item], [])
+                    saved_weather += 1
+                else:
+                    self.repository.save_batch([], [item])
+                    saved_forecasts += 1
+            except Exception as e:
+                if is_busy_error(e):
+                    print(f"⚠️ Write failed, retrying on the next flush: {e}")
+                    rest = items[index:]
+                    self.requeue([data for kind, data in rest if kind == 'weather'],
+                                 dict(data for kind, data in rest if kind == 'forecast'))
+                    break
+                self.rejected_records += 1
+                print(f"❌ Rejected {kind} record {item!r}: {e}")
+        return self.saved(saved_weather, saved_forecasts)
+    
+    def requeue(self, weather_records, forecasts):
+        """Put records that could not be written back in front of anything queued since"""
+        with self.condition:
+            self.weather_records = weather_records + self.weather_records
+            forecasts.update(self.forecasts)
+            self.forecasts = forecasts
+    
+    def saved(self, weather_count, forecast_count):
+        count = weather_count + forecast_count
+        if count:
+            print(f"✅ Saved {weather_count} weather records and {forecast_count} forecasts to database")
+        self.flushed_records += count
+        return count
+    
+    def run(self):
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            with self.condition:
+                while not self.closed and self.pending() < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                closed = self.closed
+            
+            self.flush()
+            deadline = time.monotonic() + self.flush_interval
+            if closed:
+                return
+    
+    def close(self):
+        """Flush pending records and stop the background thread"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.thread.join()
+        if self.pending():
+            # The last flush hit a busy database; try once more before giving up
+            self.flush()
+        if self.pending():
+            print(f"❌ {self.pending()} queued records could not be written")
@@ -0,0 +1,218 @@
+import threading
+
+from history_partitions import drop_partition, expired_partitions
+from weather_repository import AGGREGATE_TABLES
+
+# Rows that are their city's newest search (city_stats.last_seen) are never
+# compacted, so the offline read path always has a raw row for every city
+NEWEST_FOR_CITY = '''EXISTS (
+    SELECT 1 FROM city_stats
+    WHERE city_stats.city = {table}.city AND city_stats.last_seen = {table}.searched_at
+)'''
+
+# Bucket expression per aggregate resolution, applied to searched_at
+AGGREGATE_BUCKETS = {
+    'hourly': "strftime('%Y-%m-%d %H:00:00', searched_at)",
+    'daily': "date(searched_at)"
+}
+
+# Fold the rows of {source} matching {condition} into one aggregate table.
+# Sums and counts add up, so compacting in many small batches gives the same
+# result as one pass; MIN/MAX go through COALESCE because either side may be NULL.
+DOWNSAMPLE_SQL = '''
+    INSERT INTO {table} (city, bucket, samples, temp_min, temp_max, temp_sum,
+                         humidity_min, humidity_max, humidity_sum, humidity_count,
+                         wind_min, wind_max, wind_sum, wind_count)
+    SELECT city, {bucket}, COUNT(*), MIN(temperature), MAX(temperature), TOTAL(temperature),
+           MIN(humidity), MAX(humidity), TOTAL(humidity), COUNT(humidity),
+           MIN(wind_speed), MAX(wind_speed), TOTAL(wind_speed), COUNT(wind_speed)
+    FROM {source}
+    WHERE {condition}
+    GROUP BY city, {bucket}
+    ON CONFLICT (city, bucket) DO UPDATE SET
+        samples = samples + excluded.samples,
+        temp_min = MIN(COALESCE(temp_min, excluded.temp_min), COALESCE(excluded.temp_min, temp_min)),
+        temp_max = MAX(COALESCE(temp_max, excluded.temp_max), COALESCE(excluded.temp_max, temp_max)),
+        temp_sum = temp_sum + excluded.temp_sum,
+        humidity_min = MIN(COALESCE(humidity_min, excluded.humidity_min), COALESCE(excluded.humidity_min, humidity_min)),
+        humidity_max = MAX(COALESCE(humidity_max, excluded.humidity_max), COALESCE(excluded.humidity_max, humidity_max)),
+        humidity_sum = humidity_sum + excluded.humidity_sum,
+        humidity_count = humidity_count + excluded.humidity_count,
+        wind_min = MIN(COALESCE(wind_min, excluded.wind_min), COALESCE(excluded.wind_min, wind_min)),
+        wind_max = MAX(COALESCE(wind_max, excluded.wind_max), COALESCE(excluded.wind_max, wind_max)),
+        wind_sum = wind_sum + excluded.wind_sum,
+        wind_count = wind_count + excluded.wind_count
+'''
+
+class RetentionPolicy:
+    """How many days each resolution of history is kept; None keeps it forever
+    
+    Raw rows older than raw_days are folded into the hourly and daily
+    aggregates and deleted, except each city's newest row; a sealed
+    partition goes once all of it is older than raw_days. Hourly buckets are dropped after hourly_days and
+    daily buckets after daily_days.
+    """
+    
+    def __init__(self, raw_days=90, hourly_days=365, daily_days=None):
+        for name, days in (('raw_days', raw_days), ('hourly_days', hourly_days), ('daily_days', daily_days)):
+            if days is not None and days < 1:
+                raise ValueError(f"{name} must be at least 1 day")
+        self.raw_days = raw_days
+        self.hourly_days = hourly_days
+        self.daily_days = daily_days
+    
+    def __repr__(self):
+        return (f"RetentionPolicy(raw_days={self.raw_days}, hourly_days={self.hourly_days}, "
+                f"daily_days={self.daily_days})")
+
+class HistoryCompactor:
+    """Applies a RetentionPolicy to weather_history in small incremental batches
+    
+    Each batch takes the writer lock for one short transaction, so saves from
+    the app and the batch writer interleave with a long compaction instead of
+    waiting for it. start() runs a pass every interval seconds on a daemon
+    thread. With a HistoryPartitions, each pass first seals complete periods,
+    and expired partitions are compacted and dropped whole.
+    """
+    
+    def __init__(self, repository, policy=None, partitions=None, batch_size=5000, interval=3600, pause=0.05):
+        self.repository = repository
+        self.policy = policy or RetentionPolicy()
+        self.partitions = partitions
+        self.batch_size = batch_size
+        self.interval = interval
+        self.pause = pause
+        
+        self.stop_event = threading.Event()
+        self.thread = None
+    
+    def compact_batch(self):
+        """Fold up to batch_size expired raw rows into the aggregates; returns rows removed"""
+        if self.policy.raw_days is None:
+            return 0
+        
+        with self.repository.db.writer() as conn:
+            with conn:
+                conn.execute('CREATE TEMP TABLE IF NOT EXISTS history_compaction_batch (id INTEGER PRIMARY KEY)')
+                conn.execute('DELETE FROM temp.history_compaction_batch')
+                count = conn.execute(f'''
+                    INSERT INTO temp.history_compaction_batch
+                    SELECT id FROM weather_history
+                    WHERE searched_at < datetime('now', ?) AND NOT {NEWEST_FOR_CITY.format(table='weather_history')}
+                    ORDER BY searched_at
+                    LIMIT ?
+                ''', (f'-{self.policy.raw_days} days', self.batch_size)).rowcount
+                if not count:
+                    return 0
+                
+                self.downsample(conn, 'weather_history', 'id IN (SELECT id FROM temp.history_compaction_batch)')
+                conn.execute('DELETE FROM weather_history WHERE id IN (SELECT id FROM temp.history_compaction_batch)')
+                return count
+    
+    def compact_partitions(self):
+        """Fold sealed partitions entirely past raw_days into the aggregates and drop them
+        
+        A partition holding some city's newest search keeps just those rows:
+        the others are folded and deleted, and it is dropped once none is left
+        that is still a city's newest.
+        """
+        if self.policy.raw_days is None:
+            return 0
+        
+        with self.repository.db.writer() as conn:
+            cutoff = conn.execute("SELECT datetime('now', ?)", (f'-{self.policy.raw_days} days',)).fetchone()[0]
+            names = expired_partitions(conn, cutoff)
+        
+        compacted = 0
+        for name in names:
+            if self.stop_event.is_set():
+                break
+            newest = NEWEST_FOR_CITY.format(table=name)
+            with self.repository.db.writer() as conn:
+                with conn:
+                    row_count = conn.execute(f'SELECT COUNT(*) FROM {name}').fetchone()[0]
+                    kept = conn.execute(f'SELECT COUNT(*) FROM {name} WHERE {newest}').fetchone()[0]
+                    if kept == row_count:
+                        continue
+                    
+                    if kept:
+                        self.downsample(conn, name, f'NOT {newest}')
+                        conn.execute(f'DELETE FROM {name} WHERE NOT {newest}')
+                        conn.execute('UPDATE history_partitions SET row_count = ? WHERE name = ?', (kept, name))
+                    else:
+                        self.downsample(conn, name, '1')
+                        drop_partition(conn, name)
+                    compacted += row_count - kept
+            print(f"🗜️ Compacted history partition {name}")
+        return compacted
+    
+    @staticmethod
+    def downsample(conn, source, condition):
+        for resolution, table in AGGREGATE_TABLES.items():
+            conn.execute(DOWNSAMPLE_SQL.format(
+                table=table, bucket=AGGREGATE_BUCKETS[resolution], source=source, condition=condition
+            ))
+    
+    def prune_batch(self, resolution):
+        """Drop up to batch_size aggregate buckets older than the policy allows"""
+        days = self.policy.hourly_days if resolution == 'hourly' else self.policy.daily_days
+        if days is None:
+            return 0
+        
+        table = AGGREGATE_TABLES[resolution]
+        cutoff = "date('now', ?)" if resolution == 'daily' else "datetime('now', ?)"
+        with self.repository.db.writer() as conn:
+            with conn:
+                return conn.execute(f'''
+                    DELETE FROM {table} WHERE rowid IN (
+                        SELECT rowid FROM {table} WHERE bucket < {cutoff} LIMIT ?
+                    )
+                ''', (f'-{days} days', self.batch_size)).rowcount
+    
+    def run_once(self):
+        """Compact and prune until nothing is left to do; returns the counts"""
+        totals = {'sealed': 0, 'compacted': 0, 'hourly_pruned': 0, 'daily_pruned': 0}
+        if self.partitions is not None:
+            totals['sealed'] = self.partitions.seal()
+        totals['compacted'] = self.compact_partitions()
+        
+        steps = (
+            ('compacted', self.compact_batch),
+            ('hourly_pruned', lambda: self.prune_batch('hourly')),
+            ('daily_pruned', lambda: self.prune_batch('daily'))
+        )
+        for key, step in steps:
+            while not self.stop_event.is_set():
+                count = step()
+                totals[key] += count
+                if count < self.batch_size:
+                    break
+                # Let queued writes in between batches
+                self.stop_event.wait(self.pause)
+        
+        if totals['compacted']:
+            print(f"🗜️ Compacted {totals['compacted']} history rows into hourly/daily aggregates")
+        if totals['hourly_pruned'] or totals['daily_pruned']:
+            print(f"🗑️ Pruned {totals['hourly_pruned']} hourly and {totals['daily_pruned']} daily aggregate rows")
+        return totals
+    
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"❌ History compaction failed: {e}")
+            self.stop_event.wait(self.interval)
+    
+    def start(self):
+        """Run compaction passes in the background until close()"""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name="weather-history-compactor", daemon=True)
+            self.thread.start()
+        return self
+    
+    def close(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
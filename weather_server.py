@@ -0,0 +1,179 @@
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from weather_client import WeatherAPIError
+from weather_repository import HISTORY_COLUMNS
+from single_flight import SingleFlight
+
+class LatencyTracker:
+    """Keeps recent request latencies per route and reports percentiles"""
+    
+    def __init__(self, window=1000):
+        self.window = window
+        self.samples = {}
+        self.counts = {}
+        self.lock = threading.Lock()
+    
+    def record(self, route, seconds):
+        with self.lock:
+            self.samples.setdefault(route, deque(maxlen=self.window)).append(seconds)
+            self.counts[route] = self.counts.get(route, 0) + 1
+    
+    @staticmethod
+    def percentile(sorted_values, pct):
+        index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+        return sorted_values[index]
+    
+    def summary(self):
+        """Per-route request count and p50/p99/max latency in milliseconds"""
+        with self.lock:
+            snapshot = {route: sorted(values) for route, values in self.samples.items()}
+            counts = dict(self.counts)
+        
+        return {
+            route: {
+                'count': counts[route],
+                'p50_ms': round(self.percentile(values, 50) * 1000, 2),
+                'p99_ms': round(self.percentile(values, 99) * 1000, 2),
+                'max_ms': round(values[-1] * 1000, 2)
+            }
+            for route, values in snapshot.items() if values
+        }
+
+class WeatherRequestHandler(BaseHTTPRequestHandler):
+    server_version = "WeatherServer/1.0"
+    
+    def do_GET(self):
+        start = time.perf_counter()
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        route = url.path.rstrip('/') or '/'
+        
+        handlers = {
+            '/weather': self.handle_weather,
+            '/forecast': self.handle_forecast,
+            '/history': self.handle_history,
+            '/metrics': self.handle_metrics
+        }
+        
+        handler = handlers.get(route)
+        if handler is None:
+            status, body = 404, {'error': f"Unknown endpoint {route}"}
+        else:
+            try:
+                status, body = handler(query)
+            except WeatherAPIError as e:
+                status = 404 if e.status_code == 404 else 502
+                body = {'error': str(e)}
+            except Exception as e:
+                status, body = 500, {'error': str(e)}
+        
+        self.send_json(status, body)
+        self.server.latency.record(route if handler else 'unknown', time.perf_counter() - start)
+    
+    def handle_weather(self, query):
+        city = self.require_city(query)
+        if city is None:
+            return 400, {'error': "Missing 'city' parameter"}
+        return 200, self.server.lookup('weather', city)
+    
+    def handle_forecast(self, query):
+        city = self.require_city(query)
+        if city is None:
+            return 400, {'error': "Missing 'city' parameter"}
+        return 200, {'city': city, 'days': self.server.lookup('forecast', city)}
+    
+    def handle_history(self, query):
+        city = self.require_city(query)
+        try:
+            limit = int(query.get('limit', ['50'])[0])
+        except ValueError:
+            return 400, {'error': "'limit' must be an integer"}
+        if limit < 1:
+            # SQLite reads a negative LIMIT as no limit at all
+            return 400, {'error': "'limit' must be at least 1"}
+        limit = min(1000, limit)
+        
+        rows = self.server.service.repository.history_records(city, limit)
+        return 200, {'city': city, 'records': [dict(zip(HISTORY_COLUMNS, row)) for row in rows]}
+    
+    def handle_metrics(self, query):
+        service = self.server.service
+        metrics = {
+            'uptime_s': round(time.time() - self.server.started_at, 1),
+            'latency': self.server.latency.summary(),
+            'coalesced_requests': self.server.single_flight.shared,
+            'coalesced_upstream_calls': service.single_flight.shared,
+            'rate_limiter': service.client.rate_limiter.stats() if service.client.rate_limiter else None,
+            'cache': service.cache.stats() if service.cache else None
+        }
+        return 200, metrics
+    
+    @staticmethod
+    def require_city(query):
+        city = ' '.join(query.get('city', [''])[0].split())
+        return city or None
+    
+    def send_json(self, status, body):
+        payload = json.dumps(body, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+    
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+class WeatherServer(ThreadingHTTPServer):
+    """Long-running JSON API over WeatherService
+    
+    GET /weather?city=X, /forecast?city=X, /history?city=X&limit=N, /metrics
+    """
+    
+    daemon_threads = True
+    
+    def __init__(self, service, host='127.0.0.1', port=8080, save_history=False, quiet=False):
+        super().__init__((host, port), WeatherRequestHandler)
+        self.service = service
+        self.save_history = save_history
+        self.quiet = quiet
+        self.single_flight = SingleFlight()
+        self.latency = LatencyTracker()
+        self.started_at = time.time()
+    
+    def lookup(self, endpoint, city):
+        """Fetch from upstream, coalescing concurrent requests for the same city"""
+        key = (endpoint, city.casefold())
+        
+        if endpoint == 'weather':
+            def fetch():
+                data = self.service.fetch_current_weather(city)
+                if self.save_history:
+                    self.service.save_weather(data)
+                return data
+        else:
+            def fetch():
+                data = self.service.fetch_forecast(city)
+                if self.save_history:
+                    self.service.save_forecast(city, data)
+                return data
+        
+        return self.single_flight.do(key, fetch)
+
+def serve(service, host='127.0.0.1', port=8080, save_history=False, quiet=False):
+    """Run the weather server until interrupted"""
+    server = WeatherServer(service, host, port, save_history=save_history, quiet=quiet)
+    print(f"🌐 Weather server listening on http://{host}:{server.server_port}")
+    print("   Endpoints: /weather?city=  /forecast?city=  /history?city=&limit=  /metrics")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Shutting down weather server")
+    finally:
+        server.server_close()
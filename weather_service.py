@@ -0,0 +1,188 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from weather_client import WeatherAPIClient, get_weather_icon, parse_current_weather
+from forecast_engine import aggregate_forecast
+from weather_cache import TTLCache
+from weather_repository import FORECAST_COLUMNS, HISTORY_COLUMNS, WeatherRepository, BatchWriter
+from weather_retention import HistoryCompactor, RetentionPolicy
+from weather_prefetch import PrefetchScheduler
+from history_partitions import HistoryPartitions
+from rate_limiter import get_shared_limiter
+from single_flight import SingleFlight
+
+DEFAULT_BASE_URL = "http://api.openweathermap.org/data/2.5"
+DEFAULT_CACHE_TTLS = {'weather': 600, 'forecast': 3600}
+
+class WeatherService:
+    """Fetch, parse and persist weather data without any GUI dependency"""
+    
+    def __init__(self, api_key=None, base_url=DEFAULT_BASE_URL, repository=None, cache=None,
+                 client=None, cache_ttls=None, pool_maxsize=10,
+                 calls_per_minute=60, calls_per_day=None, write_batch_size=500, write_interval=1.0,
+                 retention=None, partition_period=None, prefetch_top=0):
+        self.api_key = api_key if api_key is not None else os.environ.get('OPENWEATHER_API_KEY', '')
+        if repository is None:
+            # A repository built here has had no chance to be migrated by the caller;
+            # batched forecast saves need the unique (city, forecast_date) index
+            repository = WeatherRepository()
+            repository.init_schema()
+        self.repository = repository
+        self.cache = cache
+        self.cache_ttls = dict(DEFAULT_CACHE_TTLS, **(cache_ttls or {}))
+        self.client = client or WeatherAPIClient(
+            base_url, self.api_key,
+            pool_maxsize=pool_maxsize,
+            rate_limiter=get_shared_limiter(calls_per_minute, calls_per_day)
+        )
+        
+        # Concurrent lookups of the same (city, units, endpoint) share one upstream request
+        self.single_flight = SingleFlight()
+        
+        # Individual saves are queued and written in batched transactions
+        self.writer = BatchWriter(self.repository, max_batch=write_batch_size, flush_interval=write_interval)
+        
+        # With a RetentionPolicy, old history is downsampled and pruned in the background;
+        # with a partition_period ('month' or 'day'), complete periods are sealed into partitions
+        self.compactor = None
+        if retention is not None or partition_period is not None:
+            partitions = HistoryPartitions(self.repository, partition_period) if partition_period else None
+            self.compactor = HistoryCompactor(
+                self.repository, retention or RetentionPolicy(raw_days=None, hourly_days=None), partitions
+            ).start()
+        
+        # With prefetch_top, the most searched cities are kept warm in the cache
+        # in the background; it needs both a cache and an API key to be useful
+        self.prefetcher = None
+        if prefetch_top:
+            self.start_prefetch(prefetch_top)
+    
+    def start_prefetch(self, top_n):
+        """Start keeping the top_n most searched cities warm; returns the scheduler or None"""
+        if self.prefetcher is None and self.cache is not None and self.api_key.strip():
+            self.prefetcher = PrefetchScheduler(self, top_n=top_n).start()
+        return self.prefetcher
+    
+    def fetch_json(self, endpoint, city, units='metric'):
+        """Fetch raw API JSON, through the response cache when one is configured"""
+        key = TTLCache.make_key(' '.join(city.split()), units, endpoint)
+        
+        def fetch():
+            return self.fetch_upstream(key, endpoint, city, units)
+        
+        if self.cache is None:
+            return fetch()
+        return self.cache.get_or_fetch(key, fetch, ttl=self.cache_ttls[endpoint])
+    
+    def refresh_json(self, endpoint, city, units='metric', wait=True):
+        """Fetch raw API JSON from upstream now and replace the cached response
+        
+        With wait=False the call fails with a 429 WeatherAPIError instead of
+        waiting for the rate limiter.
+        """
+        key = TTLCache.make_key(' '.join(city.split()), units, endpoint)
+        data = self.fetch_upstream(key, endpoint, city, units, wait)
+        if self.cache is not None:
+            self.cache.set(key, data, ttl=self.cache_ttls[endpoint])
+        return data
+    
+    def fetch_upstream(self, key, endpoint, city, units, wait=True):
+        # Concurrent calls for the same key share one request. Callers that wait for the
+        # rate limiter never join a no-wait flight, whose quick 429 they would inherit
+        return self.single_flight.do(
+            (key, wait), lambda: self.client.get_json(endpoint, {'q': city, 'units': units}, wait=wait)
+        )
+    
+    def fetch_current_weather(self, city):
+        """Current conditions for a city; raises WeatherAPIError on failure"""
+        return parse_current_weather(self.fetch_json('weather', city))
+    
+    def fetch_forecast(self, city):
+        """Daily forecast for a city; raises WeatherAPIError on failure"""
+        return aggregate_forecast(self.fetch_json('forecast', city))
+    
+    def fetch_city(self, city, executor=None):
+        """Fetch current weather and forecast for one city concurrently"""
+        if executor is None:
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                return self.fetch_city(city, pool)
+        
+        weather_future = executor.submit(self.fetch_current_weather, city)
+        forecast_future = executor.submit(self.fetch_forecast, city)
+        return weather_future.result(), forecast_future.result()
+    
+    def search(self, city, save=True):
+        """Fetch a city and store the result, like a search in the GUI"""
+        weather_data, forecast_data = self.fetch_city(city)
+        if save:
+            self.repository.save_batch([weather_data], [(city, forecast_data)])
+        return weather_data, forecast_data
+    
+    def last_known_weather(self, city=None):
+        """The newest stored weather for a city (or the last city searched), or None
+        
+        Used when the API cannot be reached: the record is read from
+        weather_history, marked is_stale and dated by as_of. History keeps no
+        daily high/low, so those are None.
+        """
+        self.flush()
+        row = self.repository.latest_weather(city)
+        if row is None:
+            return None
+        
+        record = dict(zip(HISTORY_COLUMNS, row))
+        del record['id']
+        record.update(
+            description=record['description'] or record['condition'],
+            high=None,
+            low=None,
+            is_stale=True,
+            as_of=record.pop('searched_at')
+        )
+        return record
+    
+    def last_known_forecast(self, city):
+        """The stored forecast for a city from today on, marked is_stale; [] if there is none"""
+        self.flush()
+        forecast = []
+        for row in self.repository.latest_forecast(city, date.today().isoformat()):
+            day = dict(zip(FORECAST_COLUMNS, row))
+            forecast.append({
+                'day': day['day_name'],
+                'date': date.fromisoformat(day['forecast_date']),
+                'high': day['high_temp'],
+                'low': day['low_temp'],
+                'condition': day['condition'],
+                'icon': get_weather_icon(day['condition']),
+                'description': day['description'] or day['condition'],
+                'humidity': day['humidity'],
+                'wind_speed': day['wind_speed'],
+                'precipitation_chance': day['precipitation_chance'],
+                'is_stale': True,
+                'as_of': day['created_at']
+            })
+        return forecast
+    
+    def save_weather(self, data):
+        """Queue a current-weather record for the next batched write"""
+        self.writer.add_weather(data)
+    
+    def save_forecast(self, city, forecast_data):
+        """Queue a city's forecast to replace the stored one on the next batched write"""
+        self.writer.add_forecast(city, forecast_data)
+    
+    def flush(self):
+        """Write queued records now, e.g. before reading them back"""
+        self.writer.flush()
+    
+    def close(self):
+        if self.prefetcher is not None:
+            self.prefetcher.close()
+        if self.compactor is not None:
+            self.compactor.close()
+        self.writer.close()
+        self.client.close()
+        if self.cache is not None and self.cache.sqlite_tier is not None:
+            self.cache.sqlite_tier.close()
+        self.repository.close()